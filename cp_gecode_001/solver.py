@@ -86,43 +86,35 @@
 #
 # -------------------------------------------------------------------------------------------------- 
 
+import sys
 import os
-from subprocess import Popen, PIPE
-from collections import namedtuple
 
-Set = namedtuple("Set", ['index', 'cost', 'items'])
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.reader import Task, parse_input  # Set(index, cost, items) is there too
+from cp_homebrew_003.redundancy import prune_solution
+from cp_homebrew_003.exporter import export, write_gecode_data
+from cp_homebrew_003.backend import run_backend
+
+TIMEOUT = None  # seconds for Gecode, None - no limit. It prints every solution, so we keep the last one
 
 def solve_it(input_data):
     # parse the input
-    lines = input_data.split('\n')
-
-    parts = lines[0].split()
-    item_count = int(parts[0])
-    set_count = int(parts[1])
-    
-    sets = []
-    for i in range(1, set_count+1):
-        parts = lines[i].split()
-        sets.append(Set(i-1, float(parts[0]), map(int, parts[1:])))
-
-    # generate data file -> this is necessary since we cannot pass over the instance file name
-    data_file = "data.txt"
-    generateDataFile(item_count, set_count, sets, data_file)
+    item_count, set_count, sets = parse_input(input_data)
 
     # specify the number of solutions you want to compute. '0' returns all solutions.
     nb_solutions = 20 
 
-    # solve using the Gecode executable 'set_cover'
-    process = Popen(['./set_cover', 'data.txt', str(nb_solutions)], 
-                    stdout=PIPE, stderr=PIPE)
+    # solve using the Gecode executable 'set_cover'. It reads the instance file, so we give it
+    # /dev/stdin and stream the data there: nothing is written to the disk, parallel runs don't clash
+    executable = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'set_cover')
+    writer = lambda out: write_gecode_data(item_count, set_count, sets, out)
+    result = run_backend([executable, '/dev/stdin', str(nb_solutions)], writer=writer, timeout=TIMEOUT)
     # ALTERNATIVELY: run Gecode with the search visualization tool 'gist' to browse 
     #                the search tree. This will open a window where clicking on 
     #                'Search'->'all solutions' will display the whole search tree.
     #                You will need to have compiled Gecode with gist on, however. 
-    #process = Popen(['./set_cover', '-mode gist','data.txt', str(nb_solutions)], 
-    #                stdout=PIPE, stderr=PIPE)
-
-    (stdout, stderr) = process.communicate()
+    #result = run_backend([executable, '-mode gist', '/dev/stdin', str(nb_solutions)], writer=writer)
+    (stdout, stderr) = result.stdout, result.stderr
 
     # comment the following line if you do not want to see Gecode's output
     print stdout
@@ -131,6 +123,8 @@ def solve_it(input_data):
 
     # extract the solution from standard-out
     obj,solution = extractSolution(stdout,set_count)
+    # the last solution of Gecode before the timeout can have sets, that are covered by others
+    obj, solution = prune_solution(Task(item_count, set_count, sets), solution)
 
     # prepare the solution in the specified output format
     output_data = str(obj) + ' ' + str(0) + '\n'
@@ -141,18 +135,7 @@ def solve_it(input_data):
 
 # ##################################################################################
 def generateDataFile(item_count, set_count, sets, data_file):
-    tmpFile = open(data_file, 'w')
-    
-    out = str(item_count)+ " "+ str(set_count)+ "\n"
-    for s in sets:
-        out+= str(int(s.cost))
-        out += " "
-        for e in s.items:
-            out += str(int(e)) + " "
-        out += "\n"
-            
-    tmpFile.write(out)
-    tmpFile.close()
+    export(write_gecode_data, item_count, set_count, sets, data_file)
 # ##################################################################################
 def extractSolution(stdout,set_count):
     solution = []
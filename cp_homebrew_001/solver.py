@@ -36,24 +36,19 @@
 # a simple CP solver
 # 
 
+import os
+import sys
 from collections import namedtuple
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.reader import parse_input  # Set(index, cost, items) is there too
+
 Problem = namedtuple("Problem", ['items', 'sets'])
-Set = namedtuple("Set", ['index', 'cost', 'items'])
 Solution = namedtuple("Solution", ['assignment', 'obj'])
 
 def solve_it(input_data):
 
     # parse the input
-    lines = input_data.split('\n')
-
-    parts = lines[0].split()
-    item_count = int(parts[0])
-    set_count = int(parts[1])
-    
-    sets = []
-    for i in range(1, set_count+1):
-        parts = lines[i].split()
-        sets.append(Set(i-1, float(parts[0]), map(int, parts[1:])))
+    item_count, set_count, sets = parse_input(input_data)
 
     problem = Problem(range(0,item_count), sets)
     
@@ -36,53 +36,68 @@
 # 
 
 
+import os
+import sys
 from collections import namedtuple 
+from time import time as now
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.anytime import Incumbent
+from cp_homebrew_003.reader import Task, parse_input  # Set(index, cost, items) is there too
+
 Problem = namedtuple("Problem", ['items', 'sets'])
-Set = namedtuple("Set", ['index', 'cost', 'items'])
 Solution = namedtuple("Solution", ['assignment', 'obj'])
 
 def solve_it(input_data):
     
     # parse the input
-    lines = input_data.split('\n')
-
-    parts = lines[0].split()
-    item_count = int(parts[0])
-    set_count = int(parts[1])
+    item_count, set_count, sets = parse_input(input_data)
+    
+    solver_data = search(Task(item_count, set_count, sets))
+    
+    solution = solver_data['best_solution']
     
-    sets = []
-    for i in range(1, set_count+1):
-        parts = lines[i].split()
-        sets.append(Set(i-1, float(parts[0]), map(int, parts[1:])))
+    print 'total search nodes:', solver_data['node_count']
+    print 'total fails:       ', solver_data['fail_count']
+    
+    # prepare the solution in the specified output format
+    output_data = str(solution.obj) + ' ' + str(0) + '\n'
+    output_data += ' '.join(map(str, solution.assignment))
     
+    return output_data
+
+
+def search(task, timeout=None, on_improvement=None):
+    # The anytime interface: on_improvement(anytime.Improvement) gets every improved solution,
+    # and the last one once more, when the search is over before the timeout (None - no limit)
     
     # Improvement: re-order sets from the order in the file 
     #  to improve the search procudure.
     #  Don't forget to un-order them in the output_data.
-    problem = Problem(range(0,item_count), sets)
+    problem = Problem(range(0,task.item_count), task.sets)
     
-    solver_data = {'best_solution':None, 'node_count':0, 'fail_count':0}
+    incumbent = Incumbent(task.set_count, on_improvement)
+    deadline = now() + timeout if timeout is not None else None
+    solver_data = {'best_solution':None, 'node_count':0, 'fail_count':0,
+                   'incumbent':incumbent, 'deadline':deadline, 'timed_out':False}
     
     # define the domains of all the variables {0,1}
-    domains = [range(0,2)]*set_count
+    domains = [range(0,2)]*task.set_count
     
     # start a trivial depth first search for a solution
     tryall([], domains, problem, solver_data)
     
     solution = solver_data['best_solution']
+    if solution != None and not solver_data['timed_out']:
+        incumbent.offer(solution.obj, solution.assignment, proven_optimal=True)
     
-    print 'total search nodes:', solver_data['node_count']
-    print 'total fails:       ', solver_data['fail_count']
-    
-    # prepare the solution in the specified output format
-    output_data = str(solution.obj) + ' ' + str(0) + '\n'
-    output_data += ' '.join(map(str, solution.assignment))
-    
-    return output_data
+    return solver_data
 
 
 def tryall(assignment, domains, problem, data):
     data['node_count'] += 1
+    if data['deadline'] != None and now() > data['deadline']:
+        data['timed_out'] = True
+        return
     
     # base-case: if the domains list is empty, all values are assigned
     # check if it is a feasible solution,
@@ -94,6 +109,7 @@ def tryall(assignment, domains, problem, data):
             if data['best_solution'] == None or data['best_solution'].obj > obj:
                 print 'improved solution to:', obj, ' \tsearch nodes:', data['node_count'], ' \tfails:', data['fail_count'] 
                 data['best_solution'] = Solution(assignment, obj)
+                data['incumbent'].offer(obj, assignment)
             else:
                 data['fail_count'] += 1
         return
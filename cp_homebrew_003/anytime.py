@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+The common interface of anytime solvers. A solver takes on_improvement and calls it with
+Improvement(elapsed, cost, assignment, proven_optimal) on every better solution (and once more with
+proven_optimal=True, when it proves the last one), instead of printing it.
+Incumbent keeps the best solution of a run and makes Improvements of it.
+
+A solver with the signature solver(task, timeout, on_improvement=None) can run in its own process:
+stream() yields its improvements as they come, race() runs several solvers at once and yields
+the improvements over the best of all of them. The caller can stop the iteration at any moment
+with the best solution so far, the processes are terminated then.
+"""
+import os
+import signal
+import sys
+from collections import namedtuple
+from multiprocessing import Process, Queue
+from Queue import Empty
+from time import time as now
+
+from reader import Instance, release_instance, share_instance
+from solution_store import to_solution
+
+POLL_INTERVAL = 0.05
+STOP_TIMEOUT = 5  # seconds for a terminated solver to clean up, e.g. to stop its own workers
+
+# assignment - [0|1] for every set
+Improvement = namedtuple('Improvement', ['elapsed', 'cost', 'assignment', 'proven_optimal'])
+
+
+def improves(best, cost, proven_optimal=False):
+    # Is the solution better than the best Improvement (None - nothing yet), or does it prove the same cost?
+    return best is None or cost < best.cost or cost == best.cost and proven_optimal and not best.proven_optimal
+
+
+class Incumbent(object):
+    def __init__(self, set_count, on_improvement=None):
+        self.set_count = set_count
+        self.on_improvement = on_improvement
+        self.started = now()
+        self.best = None  # the last Improvement
+
+    @property
+    def cost(self):
+        return self.best.cost if self.best is not None else float('inf')
+
+    def offer(self, cost, assignment, proven_optimal=False):
+        # Returns True, if the solution is better than the best one, or proves the same cost
+        if not improves(self.best, cost, proven_optimal):
+            return False
+        self.best = Improvement(now() - self.started, cost, list(assignment), proven_optimal)
+        if self.on_improvement is not None:
+            self.on_improvement(self.best)
+        return True
+
+    def offer_chosen(self, cost, chosen, proven_optimal=False):
+        # chosen - indexes of chosen sets
+        return self.offer(cost, to_solution(chosen, self.set_count), proven_optimal)
+
+
+def run_solver(name, solver, task, timeout, improvements):
+    # terminate() raises SystemExit here, so finally blocks of the solver stop its workers and release memory
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+    # Solvers print their progress ("update solution ..."), it would mix with the output of the caller.
+    # dup2 silences the executables they run too, stderr is kept for the tracebacks
+    sys.stdout.flush()
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    sys.stdout = open(os.devnull, 'w')
+    if isinstance(task, Instance):  # attached to the shared memory
+        task = task.as_task()
+    solver(task, timeout, on_improvement=lambda improvement: improvements.put((name, improvement)))
+    improvements.put((name, None))  # finished
+
+
+def race(task, timeout, solvers):
+    # solvers - {name: solver(task, timeout, on_improvement=None)}, use functools.partial for other options.
+    # Yields (name, Improvement) with elapsed since the start of the race, only the improvements over
+    # all solvers. Stops on the timeout, when every solver has finished, or when some one has proven the optimum
+    started = now()
+    deadline = started + timeout
+    improvements = Queue()
+    # Solvers attach to the columns of the task in shared memory, instead of getting a copy of every set
+    instance = share_instance(Instance.from_task(task)) if len(task.sets) == task.set_count else None
+    processes = [Process(target=run_solver, args=(name, solver, instance or task, timeout, improvements))
+                 for name, solver in solvers.iteritems()]
+    for process in processes:
+        process.start()
+
+    best = None
+    running = len(processes)
+    try:
+        while running and now() < deadline:
+            try:
+                name, improvement = improvements.get(timeout=min(POLL_INTERVAL, max(0, deadline - now())))
+            except Empty:
+                if not any(process.is_alive() for process in processes) and improvements.empty():
+                    break  # a solver has failed without saying it
+                continue
+            if improvement is None:
+                running -= 1
+                continue
+            if not improves(best, improvement.cost, improvement.proven_optimal):
+                continue
+            best = improvement._replace(elapsed=now() - started)
+            yield name, best
+            if best.proven_optimal:
+                break
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGKILL)
+                process.join()
+        if instance is not None:
+            release_instance(instance.shared_name)
+
+
+def stream(solver, task, timeout):
+    # Yields the Improvements of one solver, that runs in its own process
+    for _, improvement in race(task, timeout, {'solver': solver}):
+        yield improvement
+
+
+if __name__ == '__main__':
+    from functools import partial
+    from cp_solver import deep_search
+    from cp_strategies import restart_search
+    from reader import read_input
+    for fn in ['sc_157_0', 'sc_1000_11']:
+        print '=== {} ==='.format(fn)
+        solvers = {'deep_search': deep_search, 'restart_search': partial(restart_search, seed=0)}
+        for name, improvement in race(read_input(fn), 30, solvers):
+            print '{:>6.2f}s {:<15} {} {}'.format(improvement.elapsed, name, improvement.cost,
+                                                  'optimal' if improvement.proven_optimal else '')
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Runner of the external solvers (mm_SA_001/setCoversa, cp_gecode_001/set_cover, MiniZinc).
+Every run works in its own temp directory, so parallel runs don't overwrite data files of each other.
+Without data_file the instance is streamed into stdin of the process and never touches the disk.
+A run can be limited in time and cancelled from another thread, the output printed so far is kept.
+BackendPool runs batches on a few threads, each with its own working directory. It is a thread-pooled runner,
+not a pool of solver processes: the backends read one instance and exit, so every run starts a new process.
+"""
+import os
+import shutil
+import signal
+from collections import namedtuple
+from Queue import Queue
+from subprocess import Popen, PIPE
+from tempfile import mkdtemp
+from threading import Event, Lock, Thread, Timer
+
+from exporter import BUFFER_SIZE
+
+HAS_GROUPS = hasattr(os, 'setsid') and hasattr(os, 'killpg')
+
+BackendResult = namedtuple('BackendResult', ['stdout', 'stderr', 'returncode', 'timed_out', 'cancelled'])
+
+
+def find_executable(directory, name):
+    # The binary built in the directory of the solver, or the one from PATH
+    path = os.path.join(directory, name)
+    return path if os.path.isfile(path) and os.access(path, os.X_OK) else name
+
+
+class BackendRun(object):
+    def __init__(self, command, writer=None, data_file=None, timeout=None):
+        self.command = command      # [executable, args...], paths are relative to the working directory
+        self.writer = writer        # writer(out) writes the instance into the file-like out
+        self.data_file = data_file  # name of the data file in the working directory, None - write into stdin
+        self.timeout = timeout      # seconds, None - no limit
+        self.process = None
+        self.timed_out = False
+        self.cancelled = False
+        self.result = None
+        self.done = Event()
+        self.lock = Lock()
+
+    def run(self, workdir=None):
+        own_dir = workdir is None
+        if own_dir:
+            workdir = mkdtemp(prefix='setcover-')
+        try:
+            self.result = self.execute(workdir)
+        finally:
+            if own_dir:
+                shutil.rmtree(workdir, ignore_errors=True)
+            self.done.set()
+        return self.result
+
+    def execute(self, workdir):
+        stream_input = self.writer is not None and self.data_file is None
+        if self.writer is not None and self.data_file is not None:
+            with open(os.path.join(workdir, self.data_file), 'w', BUFFER_SIZE) as out:
+                self.writer(out)
+
+        with self.lock:
+            if self.cancelled:
+                return BackendResult('', '', None, False, True)
+            # A new process group, so kill() stops the children of the backend too (mzn-g12mip runs several)
+            try:
+                self.process = Popen(self.command, cwd=workdir, bufsize=BUFFER_SIZE,
+                                     stdin=PIPE if stream_input else None, stdout=PIPE, stderr=PIPE,
+                                     preexec_fn=os.setsid if HAS_GROUPS else None)
+            except OSError as error:  # no such executable
+                return BackendResult('', str(error), None, False, False)
+        timer = None
+        if self.timeout is not None:
+            timer = Timer(self.timeout, self.expire)
+            timer.daemon = True
+            timer.start()
+
+        # stdout and stderr are read by threads, so the process never blocks on a full pipe, while we write
+        outputs = {}
+        readers = [Thread(target=read_stream, args=(self.process.stdout, outputs, 'stdout')),
+                   Thread(target=read_stream, args=(self.process.stderr, outputs, 'stderr'))]
+        for reader in readers:
+            reader.daemon = True
+            reader.start()
+        if stream_input:
+            try:
+                self.writer(self.process.stdin)
+                self.process.stdin.close()
+            except IOError:
+                pass  # the process has exited or has been killed, before it has read everything
+        for reader in readers:
+            reader.join()
+        returncode = self.process.wait()
+        if timer is not None:
+            timer.cancel()
+            timer.join()  # a timer thread, that is alive at the exit of Python, fails there
+        return BackendResult(outputs.get('stdout', ''), outputs.get('stderr', ''), returncode,
+                             self.timed_out, self.cancelled)
+
+    def expire(self):
+        self.timed_out = True
+        self.kill()
+
+    def cancel(self):
+        self.cancelled = True
+        self.kill()
+
+    def kill(self):
+        with self.lock:
+            if self.process is not None and self.process.poll() is None:
+                try:
+                    if HAS_GROUPS:
+                        os.killpg(self.process.pid, signal.SIGKILL)
+                    else:
+                        self.process.kill()
+                except OSError:
+                    pass  # it has just exited
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.result
+
+
+def read_stream(stream, outputs, key):
+    outputs[key] = stream.read()
+    stream.close()
+
+
+def run_backend(command, writer=None, data_file=None, timeout=None):
+    return BackendRun(command, writer, data_file, timeout).run()
+
+
+class BackendPool(object):
+    # Workers are threads: the work is done by the processes of the backends anyway.
+    # A worker starts a new process for every run, it keeps only one working directory for all its runs
+    def __init__(self, workers):
+        self.queue = Queue()
+        self.runs = []
+        self.workers = [Thread(target=self.work) for _ in xrange(workers)]
+        for worker in self.workers:
+            worker.daemon = True
+            worker.start()
+
+    def work(self):
+        workdir = mkdtemp(prefix='setcover-')
+        try:
+            while True:
+                run = self.queue.get()
+                if run is None:
+                    break
+                run.run(workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def submit(self, run):
+        self.runs.append(run)
+        self.queue.put(run)
+        return run
+
+    def map(self, runs):
+        return [run.wait() for run in [self.submit(run) for run in runs]]
+
+    def cancel_all(self):
+        for run in self.runs:
+            run.cancel()
+
+    def close(self):
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.cancel_all()
+        self.close()
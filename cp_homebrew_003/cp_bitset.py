@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Compact replacement for set() of small non-negative ints (item indexes).
+Items are packed into bits of one Python int, so intersection, difference and
+subset tests are word-parallel operations on the int instead of loops over hash tables.
+It supports the part of the set() interface, that State and estimators use,
+so it can be passed as State.from_task(task, items_class=BitSet).
+"""
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+class BitSet(object):
+    __slots__ = ('bits', 'count')
+
+    def __init__(self, items=(), bits=None):
+        if bits is None:
+            bits = 0
+            for item in items:
+                bits |= 1 << item
+        self.bits = bits
+        self.count = popcount(bits)  # cached, so len() is O(1)
+
+    @staticmethod
+    def _bits(other):
+        if isinstance(other, BitSet):
+            return other.bits
+        return BitSet(other).bits
+
+    def __len__(self):
+        return self.count
+
+    def __nonzero__(self):
+        return self.bits != 0
+
+    __bool__ = __nonzero__
+
+    def __iter__(self):
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def __contains__(self, item):
+        return (self.bits >> item) & 1 == 1
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.bits.__sizeof__()
+
+    def __repr__(self):
+        return 'BitSet({})'.format(list(self))
+
+    def __eq__(self, other):
+        return self.bits == self._bits(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __le__(self, other):  # is subset of
+        return self.bits & ~self._bits(other) == 0
+
+    def __ge__(self, other):  # is superset of
+        other_bits = self._bits(other)
+        return other_bits & ~self.bits == 0
+
+    def __and__(self, other):
+        return BitSet(bits=self.bits & self._bits(other))
+
+    def __or__(self, other):
+        return BitSet(bits=self.bits | self._bits(other))
+
+    def __sub__(self, other):
+        return BitSet(bits=self.bits & ~self._bits(other))
+
+    def __iand__(self, other):
+        self.bits &= self._bits(other)
+        self.count = popcount(self.bits)
+        return self
+
+    def __ior__(self, other):
+        added = self._bits(other) & ~self.bits
+        if added:
+            self.bits |= added
+            self.count += popcount(added)
+        return self
+
+    def __isub__(self, other):
+        removed = self.bits & self._bits(other)
+        if removed:
+            self.bits ^= removed
+            self.count -= popcount(removed)
+        return self
+
+    def count_common(self, other):
+        # len(self & other) without making a new object
+        return popcount(self.bits & self._bits(other))
+
+    def add(self, item):
+        bit = 1 << item
+        if not self.bits & bit:
+            self.bits |= bit
+            self.count += 1
+
+    def discard(self, item):
+        bit = 1 << item
+        if self.bits & bit:
+            self.bits ^= bit
+            self.count -= 1
+
+    def remove(self, item):
+        if item not in self:
+            raise KeyError(item)
+        self.discard(item)
+
+    def update(self, items):
+        self |= items
+
+    def copy(self):
+        return BitSet(bits=self.bits)
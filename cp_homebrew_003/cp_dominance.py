@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Index for the column dominance checks:
+ * which live sets are subsets of the given items and cost at least X (expensive subsets)
+ * whether a live set is a subset of another live set, that is not more expensive (redundant set)
+"""
+from collections import defaultdict
+
+
+class DominanceIndex(object):
+    def __init__(self, set_costs, set2items, item2sets):
+        self.set_costs = set_costs
+        # The rarer item is, the less sets we have to look through
+        self.rank = {item: (len(sets), item) for item, sets in item2sets.iteritems()}
+        self.key_of = {}                 # {set_index: its rarest not covered item}
+        self.by_key = defaultdict(set)   # {item_index: sets with this key item}
+        for set_idx, items in set2items.iteritems():
+            if items:
+                self.set_key(set_idx, min(items, key=self.rank.__getitem__))
+
+    def set_key(self, set_idx, item):
+        self.key_of[set_idx] = item
+        self.by_key[item].add(set_idx)
+
+    def on_items_removed(self, set_idx, items):
+        # The set has lost some items. If it was the key, choose the rarest of the rest.
+        # Items return back only on rollback, and the key stays among them then, so there is no need to undo it
+        key = self.key_of[set_idx]
+        if key not in items:
+            self.by_key[key].discard(set_idx)
+            self.set_key(set_idx, min(items, key=self.rank.__getitem__))
+
+    def find_subsets(self, state, items, cost_limit):
+        # Every live set has its key item among its items, so a subset of items has a key in items
+        set2items = state.set2items
+        costs = self.set_costs
+        by_key = self.by_key
+        count = len(items)
+        subsets = []
+        for item in items:
+            for set_idx in by_key.get(item, ()):
+                if costs[set_idx] >= cost_limit:
+                    set_items = set2items.get(set_idx)
+                    if set_items is not None and len(set_items) <= count and set_items <= items:
+                        subsets.append(set_idx)
+        return subsets
+
+    def is_dominated(self, state, set_idx):
+        # Every superset of the set is a candidate of its rarest item
+        set2items = state.set2items
+        item2sets = state.item2sets
+        costs = self.set_costs
+        items = set2items[set_idx]
+        cost = costs[set_idx]
+        count = len(items)
+        candidates = min((item2sets[item] for item in items), key=len)
+        for other_idx in candidates:
+            if other_idx != set_idx and costs[other_idx] <= cost:
+                other_items = set2items[other_idx]
+                if len(other_items) >= count and items <= other_items:
+                    return True
+        return False
@@ -1,21 +1,289 @@
 #!/usr/bin/env python
 # encoding: utf-8
-from math import ceil
+from heapq import heapify, heappop, heappush
+from math import ceil, floor, fsum
+
+RESYNC_PERIOD = 1000  # how often (in refreshes) we recalculate the total from scratch to drop rounding errors
+EPSILON = 1e-6        # how close to an integer the bound should be, to recalculate it precisely before ceil()
+COMPACT_SIZE = 1000   # the heap of branching scores is filtered only with more outdated entries
+
+
+class SplitCostBound(object):
+    # Sum of the cheapest "partial sets" over all not covered items.
+    # Instead of recalculating it on every node, we keep the cheapest part for every item
+    # and recalculate it only for items, that have lost (or got back) a candidate,
+    # or have a candidate, that has lost (or got back) some items.
+    # From scratch, the sets are taken in the order of their parts: every set gets the items, that no cheaper
+    # set has, so it is one set difference per set instead of min() per item. The parts and the cheapest parts
+    # of items are made then only when they are needed: by the next update by deltas (or by the Lagrangian estimator).
+
+    def __init__(self, set_costs):
+        self.set_costs = set_costs
+        self.parts = None      # {set_index: its cost / count of its not covered items}, removed sets can stay
+        self._cheapest = None  # {item_index: cost of the cheapest part of the set, that can cover the item}
+        self.state = None      # the state of the last rebuild(), the same object for the whole search
+        self.total = 0.0      # sum(self.cheapest.values()), maintained by deltas
+        self.updates = 0
+
+    @property
+    def cheapest(self):
+        # Made for the current state, if they are not made since rebuild()
+        if self._cheapest is None:
+            costs = self.set_costs
+            self.parts = {s: costs[s] / len(items) for s, items in self.state.set2items.iteritems()}
+            part = self.parts.__getitem__
+            self._cheapest = {item: min(map(part, sets)) for item, sets in self.state.item2sets.iteritems()}
+        return self._cheapest
+
+    def rebuild(self, state):
+        # Every part is counted once, not once for every item of the set
+        costs = self.set_costs
+        set2items = state.set2items
+        self.state = state
+        self.parts = self._cheapest = None
+        covered = state.items_class()
+        terms = []
+        left = len(state.item2sets)
+        for part, set_idx in sorted([(costs[s] / len(items), s) for s, items in set2items.iteritems()]):
+            new = set2items[set_idx] - covered
+            if new:
+                count = len(new)
+                terms.append(part * count)  # rounded as the sum of count equal parts
+                left -= count
+                if not left:
+                    break
+                covered |= new
+        self.total = fsum(terms)
+
+    def update(self, state, items, sets):
+        # items - items, that have been covered or have lost (or got back) candidates,
+        # or have a candidate among sets, that have lost (or got back) items
+        if self._cheapest is None:  # not made since rebuild(): all of them from scratch
+            self.total = fsum(self.cheapest.itervalues())
+            return
+        costs = self.set_costs
+        parts = self.parts
+        set2items = state.set2items
+        for set_idx in sets:
+            set_items = set2items.get(set_idx)
+            if set_items:
+                parts[set_idx] = costs[set_idx] / len(set_items)
+
+        part = parts.__getitem__
+        cheapest = self._cheapest
+        item2sets = state.item2sets
+        delta = 0.0
+        for item in items:
+            old = cheapest.get(item, 0.0)
+            candidates = item2sets.get(item)
+            if candidates is not None:
+                new = cheapest[item] = min(map(part, candidates))
+            else:  # the item is covered
+                new = 0.0
+                cheapest.pop(item, None)
+            delta += new - old
+        self.total += delta
+
+        self.updates += 1
+        if self.updates % RESYNC_PERIOD == 0:
+            self.total = fsum(cheapest.itervalues())
+
+    def get_value(self, current_cost):
+        value = current_cost + self.total
+        if value - floor(value) < EPSILON or ceil(value) - value < EPSILON:
+            # Rounding errors of the deltas can move us over the integer. Recalculate precisely
+            self.total = fsum(self.cheapest.itervalues())
+            value = current_cost + self.total
+        return ceil(value)
+
+
+class BranchingScores(object):
+    # Scores of sets for branching: sum of weights of not covered items divided by the cost,
+    # where the weight of the item is 1 / count of its candidates. Ties are broken by self.order.
+    # The sums of weights are kept for every set. A changed weight is added to the sums of the candidates
+    # of its item as a delta, only sets, that have lost or got back items, are summed again.
+    # The scores live in a heap with lazy invalidation: a set is pushed again only when its score grows.
+    # An entry, that is outdated or higher than the score, is dropped or pushed again, when it gets to the top.
+    # Outdated entries below the top are filtered out only when they are the most of the heap, so it takes O(1)
+    # per push and the heap doesn't grow with the count of nodes.
+    # When most of the sets are summed again (small tasks), the sums are only marked as stale, and they are
+    # counted on the next get_best(), so pruned nodes don't pay for them. Then there is no heap: the best set
+    # is found by one pass, and the heap is made only on the next update by deltas.
+
+    def __init__(self, set_costs):
+        self.set_costs = set_costs
+        self.heap = None    # [(-score, order, set_index, version)], None - not made since the last rebuild()
+        self.weights = {}   # {item_index: the weight, that is counted in the sums}
+        self.sums = {}      # {set_index: sum of weights of its not covered items}
+        self.pushed = {}    # {set_index: score of the actual heap entry}, no key - the set has no entry
+        self.versions = dict.fromkeys(set_costs, 0)  # {set_index: version of the actual heap entry}
+        self.outdated = 0   # count of heap entries of older versions
+        self.order = {s: s for s in set_costs}  # {set_index: its priority among sets with the same score}
+        self.stale = True   # the sums are not counted for the current state, get_best() will rebuild them
+        self.updates = 0
+
+    def rebuild(self, state):
+        self.weights = {item: 1.0 / len(sets) for item, sets in state.item2sets.iteritems()}
+        self.resync(state)
+        self.heap = None
+        self.stale = False
+
+    def resync(self, state):
+        # Sums from scratch, without rounding errors of the deltas
+        weight = self.weights.__getitem__
+        sums = self.sums
+        for s, items in state.set2items.iteritems():  # a plain loop is faster than update() with a generator
+            sums[s] = fsum(map(weight, items))
+
+    def reheap(self, sets):
+        costs = self.set_costs
+        sums = self.sums
+        order = self.order
+        versions = self.versions
+        self.pushed = {s: sums[s] / costs[s] for s in sets}
+        self.heap = [(-score, order[s], s, versions[s]) for s, score in self.pushed.iteritems()]
+        heapify(self.heap)
+        self.outdated = 0
+
+    def compact(self):
+        versions = self.versions
+        self.heap = [entry for entry in self.heap if versions[entry[2]] == entry[3]]
+        heapify(self.heap)
+        self.outdated = 0
+
+    def shuffle(self, random):
+        # Break ties randomly from now on (e.g. for restarts)
+        self.order = {s: random.random() for s in self.set_costs}
+        if self.heap is not None:
+            self.reheap(self.sums)
+
+    def push(self, set_idx, score):
+        if set_idx in self.pushed:
+            self.outdated += 1
+        version = self.versions[set_idx] = self.versions[set_idx] + 1
+        self.pushed[set_idx] = score
+        heappush(self.heap, (-score, self.order[set_idx], set_idx, version))
+
+    def update(self, state, items, sets):
+        # items - items, that have been covered or have lost (or got back) candidates,
+        # sets - sets, that have lost (or got back) items
+        if self.stale:  # get_best() will count everything from scratch anyway
+            return
+        item2sets = state.item2sets
+        set2items = state.set2items
+        weights = self.weights
+        sums = self.sums
+        if 2 * len(sets) > len(set2items):  # most of the sets are summed again anyway (small tasks)
+            self.stale = True
+            return
+        self.updates += 1
+        if self.updates % RESYNC_PERIOD == 0:  # drop rounding errors of the deltas
+            for item in items:
+                candidates = item2sets.get(item)
+                weights[item] = 1.0 / len(candidates) if candidates else 0.0
+            self.resync(state)
+            grown = set2items
+        else:
+            grown = set()  # only they need new heap entries
+            for item in sorted(items):
+                candidates = item2sets.get(item)
+                weight = 1.0 / len(candidates) if candidates else 0.0
+                delta = weight - weights.get(item, 0.0)
+                if not delta:
+                    continue
+                weights[item] = weight
+                if candidates:
+                    for set_idx in candidates:
+                        if set_idx not in sets:  # it has the item before and after, the changed ones are summed again
+                            sums[set_idx] += delta
+                    if delta > 0:
+                        grown |= candidates
+            weight = weights.__getitem__
+            for set_idx in sets:
+                set_items = set2items.get(set_idx)
+                if set_items is not None:
+                    sums[set_idx] = fsum(map(weight, set_items))
+                    grown.add(set_idx)
+
+        if self.heap is None:
+            self.reheap(set2items)
+            return
+        costs = self.set_costs
+        pushed = self.pushed
+        for set_idx in grown:
+            score = sums[set_idx] / costs[set_idx]
+            if score > pushed.get(set_idx, -1.0):  # a lower score is fixed, when its entry gets to the top
+                self.push(set_idx, score)
+        if self.outdated > COMPACT_SIZE and 2 * self.outdated > len(self.heap):
+            self.compact()
+
+    def get_best(self, state):
+        # The set with the max score. If there are several ones, the set with the min order
+        if self.stale:
+            self.rebuild(state)
+        heap = self.heap
+        set2items = state.set2items
+        if heap is None:
+            sums = self.sums
+            costs = self.set_costs
+            order = self.order
+            return min(set2items, key=lambda s: (-sums[s] / costs[s], order[s]))
+        versions = self.versions
+        while True:
+            neg_score, _, set_idx, version = heap[0]
+            if versions[set_idx] != version:
+                heappop(heap)  # the set has been pushed again
+                self.outdated -= 1
+            elif set_idx not in set2items:
+                heappop(heap)  # the set is removed, it is pushed again, when it gets back
+                del self.pushed[set_idx]
+            else:
+                score = self.sums[set_idx] / self.set_costs[set_idx]
+                if score == -neg_score:
+                    return set_idx
+                heappop(heap)  # the score has fallen since the push
+                self.push(set_idx, score)
 
 
 class Estimator(object):
     def __init__(self, task):
         self.set_costs = {s.index: float(s.cost) for s in task.sets}
-        self.metrics = {'cut_exp': 0, 'not_cut_exp': 0, 'rollback_exp': 0}
+        self.metrics = {'cut_exp': 0, 'not_cut_exp': 0, 'rollback_exp': 0,
+                        'expensive_subsets': 0, 'redundant_sets': 0, 'dominance_time': 0.0}
+        self.bound = SplitCostBound(self.set_costs)
+        self.branching = BranchingScores(self.set_costs)
+        self.lower_bound = 0  # proven for the whole task (e.g. by cp_lp.presolve), so for every state too
+
+    def refresh(self, state):
+        # Take into account the changes of the state since the last call
+        # (made by on_sets_chosen / propagate_on_toss, or undone by rollback)
+        if self.bound.state is None:
+            self.bound.rebuild(state)  # the branching scores are stale at start
+        elif state.changed_sets or state.changed_items:
+            changed_items = state.changed_items
+            set2items = state.set2items
+            self.branching.update(state, changed_items, state.changed_sets)
 
-    def get_optimistic(self, state):
+            if 2 * len(state.changed_sets) > len(set2items):  # most of the parts have changed (small tasks)
+                self.bound.rebuild(state)
+            else:
+                for set_idx in state.changed_sets:
+                    items = set2items.get(set_idx)
+                    if items:  # the cost of its parts has changed
+                        changed_items.update(items)
+                self.bound.update(state, changed_items, state.changed_sets)
+        state.changed_sets = set()
+        state.changed_items = set()
+
+    def get_optimistic(self, state, upper_bound=None):
         # split every set on the not covered items and choose the cheapest one for every item
-        splitted_costs = {set_idx: self.set_costs[set_idx] / len(items)
-                          for set_idx, items in state.set2items.iteritems()
-                          if items}
-        additional = sum(min(splitted_costs[set_idx] for set_idx in sets)
-                         for item, sets in state.item2sets.iteritems())
-        return ceil(state.current_cost + additional)
+        self.refresh(state)
+        return max(self.bound.get_value(state.current_cost), self.lower_bound)
+
+    def get_fixed_sets(self, state, upper_bound):
+        # Sets, that can be excluded or must be included in every solution of the subtree,
+        # which is better than upper_bound. Call it right after get_optimistic() on the same state
+        return (), ()
 
     def cost_of_chosen_list(self, chosen_sets):
         return sum(self.set_costs[s_idx] for s_idx in chosen_sets)
@@ -23,9 +291,12 @@ class Estimator(object):
     def cost_of_chosen(self, set_idx):
         return self.set_costs[set_idx]
 
+    def shuffle(self, random):
+        # pick_a_set() will break ties between sets with the same score randomly
+        self.branching.shuffle(random)
+
     def pick_a_set(self, state):
         # Pick a set, basing on covering and the cost
-        item_weights = {idx: 1.0 / len(sets)  # The lesser candidates has item, the more critical item is
-                        for idx, sets in state.item2sets.iteritems()}
-        return max(state.set2items.iteritems(),
-                   key=lambda (s_idx, items): sum(item_weights[i] for i in items) / self.set_costs[s_idx])[0]
+        # The lesser candidates has item, the more critical item is. See BranchingScores
+        self.refresh(state)
+        return self.branching.get_best(state)
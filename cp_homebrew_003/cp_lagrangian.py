@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Lagrangian relaxation of the covering constraints.
+For any multipliers u >= 0 (one per not covered item):
+    L(u) = sum(u) + sum(min(0, reduced_cost[s]) for every set s),
+    reduced_cost[s] = cost[s] - sum(u[i] for i in items of s)
+is a lower bound of the remaining cost. We improve u with the subgradient method.
+It costs much more than the split-cost bound, so we run it only where it can prune: when the gap between
+the split-cost bound and the incumbent is within the reach of the Lagrangian bound (how much it has raised
+the split-cost bound lately), and on every CHECK_PERIOD-th node to learn the reach again.
+"""
+from math import ceil
+
+from cp_estimator import Estimator, EPSILON
+
+ROOT_ITERATIONS = 100  # the first estimation has no warm start, so it needs more iterations
+NODE_ITERATIONS = 5    # other nodes start from the multipliers of the parent
+STEP_SCALE = 2.0       # "lambda" of the subgradient step
+PATIENCE = 20          # halve the step, if the bound has not improved for so many iterations
+CHECK_PERIOD = 16      # the bound is run on every such node, even with a large gap
+REACH_FACTOR = 2.0     # run the bound, if the gap is not greater than REACH_FACTOR * the reach
+REACH_DECAY = 0.1      # the reach is the moving average of the gains with this weight of the last one
+
+
+class LagrangianEstimator(Estimator):
+    def __init__(self, task, node_iterations=NODE_ITERATIONS, root_iterations=ROOT_ITERATIONS,
+                 check_period=CHECK_PERIOD):
+        super(LagrangianEstimator, self).__init__(task)
+        self.node_iterations = node_iterations
+        self.root_iterations = root_iterations
+        self.check_period = check_period
+        self.saved = []  # [(depth, decision, multipliers)] of the estimated states on the current path
+        self.last = None  # (lower_bound, reduced_costs) of the last estimated state
+        self.reach = None  # how much the Lagrangian bound raises the split-cost one, None - not known yet
+        self.nodes = 0
+        self.metrics.update({'fixed_to_0': 0, 'fixed_to_1': 0, 'lagrangian_nodes': 0})
+
+    def get_optimistic(self, state, upper_bound=None):
+        split_cost = super(LagrangianEstimator, self).get_optimistic(state)
+        self.last = None
+        if upper_bound is None or split_cost >= upper_bound:
+            return split_cost  # nothing to prune with, or already pruned: don't waste time
+        self.nodes += 1
+        gap = upper_bound - split_cost
+        if self.reach is not None and gap > REACH_FACTOR * self.reach and self.nodes % self.check_period:
+            return split_cost  # the Lagrangian bound will hardly close the gap
+
+        self.metrics['lagrangian_nodes'] += 1
+        multipliers, iterations = self.warm_start(state)
+        target = upper_bound - state.current_cost
+        multipliers, lower_bound, reduced_costs = self.subgradient(state, multipliers, iterations, target)
+        self.save(state, multipliers)
+        self.last = (lower_bound, reduced_costs)
+        bound = ceil(state.current_cost + lower_bound - EPSILON)
+        gain = max(0, bound - split_cost)
+        self.reach = gain if self.reach is None else (1 - REACH_DECAY) * self.reach + REACH_DECAY * gain
+        return max(split_cost, bound)
+
+    def drop_saved(self, state):
+        # Forget the multipliers of the states, that are not on the path to this state anymore
+        saved = self.saved
+        decisions = state.decisions
+        while saved:
+            depth, decision, _ = saved[-1]
+            if depth <= len(decisions) and (not depth or decisions[depth - 1] is decision):
+                break
+            saved.pop()
+
+    def warm_start(self, state):
+        # Take multipliers of the closest estimated ancestor (or of this state, if we estimate it again after fixing)
+        self.drop_saved(state)
+        if not self.saved:
+            # The cheapest parts of sets give exactly the split-cost bound
+            return dict(self.bound.cheapest), self.root_iterations
+
+        source = self.saved[-1][2]
+        cheapest = self.bound.cheapest
+        return {item: source.get(item, cheapest[item]) for item in state.item2sets}, self.node_iterations
+
+    def save(self, state, multipliers):
+        depth = len(state.decisions)
+        if self.saved and self.saved[-1][0] == depth:  # estimated again after fixing
+            self.saved.pop()
+        self.saved.append((depth, state.decisions[-1] if depth else None, multipliers))
+
+    def subgradient(self, state, multipliers, iterations, target):
+        costs = self.set_costs
+        set2items = state.set2items
+        best = (multipliers, float('-inf'), None)
+        scale = STEP_SCALE
+        failures = 0
+        for _ in xrange(iterations):
+            lower_bound = sum(multipliers.itervalues())
+            reduced_costs = {}
+            chosen = []
+            for s, items in set2items.iteritems():
+                reduced_cost = costs[s] - sum(multipliers[i] for i in items)
+                reduced_costs[s] = reduced_cost
+                if reduced_cost < 0:
+                    lower_bound += reduced_cost
+                    chosen.append(s)
+
+            if lower_bound > best[1]:
+                best = (multipliers, lower_bound, reduced_costs)
+                if target is not None and lower_bound > target - 1 + EPSILON:
+                    break  # enough to prune the state (costs are integer)
+            else:
+                failures += 1
+                if failures == PATIENCE:
+                    scale /= 2
+                    failures = 0
+
+            # Subgradient: 1 - how many times the relaxed solution covers the item
+            gradient = dict.fromkeys(multipliers, 1)
+            for s in chosen:
+                for i in set2items[s]:
+                    gradient[i] -= 1
+            norm = sum(g * g for i, g in gradient.iteritems() if g > 0 or multipliers[i] > 0)
+            if norm == 0:  # the relaxed solution is a feasible cover, we can't do better with these u
+                break
+
+            # Polyak step to the target value. Without a good upper bound, aim a little above the current one
+            if target is None:
+                aim = lower_bound * 1.05 + 1
+            else:
+                aim = min(target, lower_bound * 1.1 + 1)
+            step = scale * (aim - lower_bound) / norm
+            multipliers = {i: max(0.0, u + step * gradient[i]) for i, u in multipliers.iteritems()}
+        return best
+
+    def get_fixed_sets(self, state, upper_bound):
+        # Reduced cost fixing:
+        #  if we take a set with reduced_cost > 0, the bound grows by reduced_cost
+        #  if we don't take a set with reduced_cost < 0, the bound grows by -reduced_cost
+        if self.last is None or upper_bound is None:
+            return (), ()
+        lower_bound, reduced_costs = self.last
+        self.last = None
+        if reduced_costs is None:
+            return (), ()
+        # Costs are integer, so any solution better than upper_bound costs at most upper_bound - 1
+        gap = upper_bound - 1 - state.current_cost - lower_bound + EPSILON
+        excluded = [s for s, rc in reduced_costs.iteritems() if rc > gap]
+        included = [s for s, rc in reduced_costs.iteritems() if -rc > gap]
+        self.metrics['fixed_to_0'] += len(excluded)
+        self.metrics['fixed_to_1'] += len(included)
+        return excluded, included
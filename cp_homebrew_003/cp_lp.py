@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Root node step: the LP relaxation of the set cover model
+    min sum(cost[s] * x[s]),  sum(x[s] for sets s with item i) >= 1 for every item i,  0 <= x[s] <= 1
+For any duals u >= 0 (one per item):
+    L(u) = sum(u) + sum(min(0, reduced_cost[s]) for every set s),
+    reduced_cost[s] = cost[s] - sum(u[i] for i in items of s)
+is a lower bound, and the optimal duals give the LP bound. A solution, that takes a set with
+reduced_cost > 0 (or doesn't take a set with reduced_cost < 0), costs at least L(u) + abs(reduced_cost).
+So, if it is more than the gap to the incumbent, we fix the set for the whole search.
+
+The LP is solved by scipy (HiGHS), if it is installed. Otherwise we look for the duals
+with the subgradient method: it converges to the same bound, and every iteration gives a valid one.
+"""
+from collections import namedtuple
+from heapq import heapify, heappop, heappush
+from math import ceil
+
+from cp_estimator import EPSILON
+from reader import Task
+
+try:
+    import numpy
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix
+except ImportError:
+    linprog = None
+
+ITERATIONS = 300  # of the subgradient method, when scipy is not available
+STEP_SCALE = 2.0
+PATIENCE = 20     # halve the step, if the bound has not improved for so many iterations
+
+# task - the task without excluded sets, included - sets, that every better solution has,
+# solution/upper_bound - the incumbent, is_optimal - nothing better than the incumbent exists
+RootNode = namedtuple('RootNode', ['task', 'lower_bound', 'upper_bound', 'solution', 'included', 'is_optimal'])
+
+
+def greedy_cover(task):
+    # Chvatal's greedy: the set with the least cost per new item, until everything is covered.
+    # Returns (cost, [0|1] for every set)
+    uncovered = set(item for s in task.sets for item in s.items)
+    heap = [(s.cost / len(s.items), s.index) for s in task.sets if s.items]
+    heapify(heap)
+    sets = {s.index: s for s in task.sets}
+    solution = [0] * task.set_count
+    cost = 0
+    while uncovered:
+        ratio, set_idx = heappop(heap)
+        s = sets[set_idx]
+        new = sum(1 for item in s.items if item in uncovered)
+        if not new:
+            continue
+        actual = s.cost / new
+        if actual > ratio:  # the ratio is outdated
+            heappush(heap, (actual, set_idx))
+            continue
+        uncovered.difference_update(s.items)
+        solution[set_idx] = 1
+        cost += s.cost
+    return cost, solution
+
+
+def reduced_costs(task, duals):
+    return {s.index: s.cost - sum(duals[i] for i in s.items) for s in task.sets}
+
+
+def lagrangian_bound(duals, costs):
+    return sum(duals.itervalues()) + sum(min(0.0, rc) for rc in costs.itervalues())
+
+
+def lp_duals(task):
+    # Optimal duals of the LP relaxation, or None, if scipy can't give them
+    if linprog is None:
+        return None
+    rows, cols = [], []
+    for col, s in enumerate(task.sets):
+        rows.extend(s.items)
+        cols.extend([col] * len(s.items))
+    matrix = coo_matrix((-numpy.ones(len(rows)), (rows, cols)), shape=(task.item_count, len(task.sets)))
+    try:
+        result = linprog([s.cost for s in task.sets], A_ub=matrix.tocsr(), b_ub=-numpy.ones(task.item_count),
+                         bounds=(0, 1), method='highs')
+        marginals = result.ineqlin.marginals
+    except (ValueError, AttributeError):  # old scipy without HiGHS and marginals
+        return None
+    if result.status != 0:
+        return None
+    return {item: max(0.0, -float(value)) for item, value in enumerate(marginals)}
+
+
+def subgradient_duals(task, upper_bound, iterations=ITERATIONS):
+    # The cheapest parts of sets give exactly the split-cost bound, we start from it
+    duals = {}
+    for s in task.sets:
+        part = s.cost / len(s.items) if s.items else None
+        for item in s.items:
+            if item not in duals or part < duals[item]:
+                duals[item] = part
+
+    best_duals, best_bound = duals, float('-inf')
+    scale = STEP_SCALE
+    failures = 0
+    for _ in xrange(iterations):
+        costs = reduced_costs(task, duals)
+        bound = lagrangian_bound(duals, costs)
+        if bound > best_bound:
+            best_duals, best_bound = duals, bound
+            if bound > upper_bound - 1 + EPSILON:
+                break  # the incumbent is optimal already
+        else:
+            failures += 1
+            if failures == PATIENCE:
+                scale /= 2
+                failures = 0
+
+        # Subgradient: 1 - how many times the relaxed solution covers the item
+        gradient = dict.fromkeys(duals, 1)
+        for s in task.sets:
+            if costs[s.index] < 0:
+                for item in s.items:
+                    gradient[item] -= 1
+        norm = sum(g * g for i, g in gradient.iteritems() if g > 0 or duals[i] > 0)
+        if norm == 0:
+            break
+        step = scale * (upper_bound - bound) / norm  # Polyak step to the incumbent
+        duals = {i: max(0.0, u + step * gradient[i]) for i, u in duals.iteritems()}
+    return best_duals
+
+
+def presolve(task, upper_bound=None, solution=None):
+    # Returns RootNode. Without the incumbent, we take the greedy one
+    if solution is None:
+        upper_bound, solution = greedy_cover(task)
+
+    duals = lp_duals(task)
+    if duals is None:
+        duals = subgradient_duals(task, upper_bound)
+    costs = reduced_costs(task, duals)
+    bound = lagrangian_bound(duals, costs)
+    lower_bound = ceil(bound - EPSILON)
+
+    # Costs are integer, so any better solution costs at most upper_bound - 1
+    gap = upper_bound - 1 - bound + EPSILON
+    sets = [s for s in task.sets if costs[s.index] <= gap]
+    included = [s for s, rc in costs.iteritems() if -rc > gap]
+    coverable = len(set(item for s in sets for item in s.items)) == task.item_count
+    return RootNode(Task(task.item_count, task.set_count, sets), lower_bound, upper_bound, solution, included,
+                    lower_bound >= upper_bound or not coverable)
+
+
+if __name__ == '__main__':
+    from reader import read_input
+    for fn in ['sc_157_0', 'sc_330_0', 'sc_1000_11', 'sc_5000_1', 'sc_10000_5', 'sc_10000_2']:
+        task = read_input(fn)
+        root = presolve(task)
+        print '{:<15} lp={} greedy={} sets {} -> {}, included {}'.format(
+            fn, root.lower_bound, root.upper_bound, task.set_count, len(root.task.sets), len(root.included))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Parallel version of deep_search().
+A subproblem is a path of decisions [(set_index, is_chosen)] from the root.
+Workers take subproblems from the shared queue and search in their subtrees.
+When some worker is idle, a busy worker splits off the sibling of its first chosen set
+(the biggest unexplored part of its subtree) and puts it into the queue (work stealing).
+The cost of the best found solution is shared, so every worker prunes with it.
+"""
+import sys
+from multiprocessing import Array, Process, Queue, Value, cpu_count
+from Queue import Empty
+from time import time as now
+
+from cp_estimator import Estimator
+from cp_solver import Solution, explore
+from cp_state import State
+from reader import Instance, release_instance, share_instance
+
+OUTSTANDING, PENDING, IDLE = 0, 1, 2  # counters: not finished subproblems, subproblems in the queue, idle workers
+SPLIT_PERIOD = 64  # how often (in steps) a busy worker checks, whether somebody waits for work
+POLL_INTERVAL = 0.05
+
+
+class SharedSolution(Solution):
+    # best_cost is the cost of the best solution over all workers, best_solution is the own one
+    def __init__(self, task, incumbent):
+        self.incumbent = incumbent
+        super(SharedSolution, self).__init__(task)
+        self.own_cost = sys.maxint
+
+    @property
+    def best_cost(self):
+        return self.incumbent.value
+
+    @best_cost.setter
+    def best_cost(self, value):
+        with self.incumbent.get_lock():
+            if value < self.incumbent.value:
+                self.incumbent.value = value
+
+    def store_result(self, state):
+        stored = self.best_solution
+        super(SharedSolution, self).store_result(state)
+        if self.best_solution is not stored:  # it was better than the solutions of all workers
+            self.own_cost = state.current_cost
+
+
+class Splitter(object):
+    # on_step callback of explore(): gives away a part of the subtree, if some worker is idle
+    def __init__(self, tasks, counters):
+        self.tasks = tasks
+        self.counters = counters
+        self.steps = 0
+        self.splits = 0
+
+    def __call__(self, state):
+        self.steps += 1
+        if self.steps % SPLIT_PERIOD:
+            return
+        counters = self.counters
+        if counters[IDLE] <= counters[PENDING]:  # the queue has enough work for the idle ones
+            return
+        path = state.split_off()
+        if path is not None:
+            with counters.get_lock():
+                counters[OUTSTANDING] += 1
+                counters[PENDING] += 1
+            self.tasks.put(path)
+            self.splits += 1
+
+
+def worker(task, options, tasks, results, incumbent, counters, deadline):
+    if isinstance(task, Instance):  # attached to the shared memory
+        task = task.as_task()
+    state = State.from_task(task, **options)
+    solution = SharedSolution(task, incumbent)
+    solution.metrics = state.estimator.metrics
+    splitter = Splitter(tasks, counters)
+    completed = True
+    subproblems = 0
+    while now() <= deadline:
+        try:
+            path = tasks.get(timeout=POLL_INTERVAL)
+        except Empty:
+            if counters[OUTSTANDING] == 0:  # nobody is searching, and nobody will give us a work
+                break
+            continue
+        with counters.get_lock():
+            counters[PENDING] -= 1
+            counters[IDLE] -= 1
+
+        subproblems += 1
+        state.replay(path)
+        if not explore(state, solution, deadline, splitter):
+            completed = False
+
+        with counters.get_lock():
+            counters[OUTSTANDING] -= 1
+            counters[IDLE] += 1
+
+    solution.metrics.update({'subproblems': subproblems, 'splits': splitter.splits})
+    results.put((solution.own_cost, solution.best_solution, completed, solution.steps, solution.metrics))
+
+
+def parallel_search(task, timeout=10*60, workers=None, estimator_class=Estimator, items_class=set, dominance=False):
+    workers = workers or cpu_count()
+    options = {'estimator_class': estimator_class, 'items_class': items_class, 'dominance': dominance}
+    incumbent = Value('d', sys.maxint)
+    counters = Array('i', [1, 1, workers])  # the root is the only subproblem at start
+    tasks = Queue()
+    results = Queue()
+    tasks.put([])
+
+    # Workers attach to the columns of the task in shared memory, instead of getting a copy of every set
+    instance = share_instance(Instance.from_task(task)) if len(task.sets) == task.set_count else None
+    try:
+        deadline = now() + timeout
+        processes = [Process(target=worker,
+                             args=(instance or task, options, tasks, results, incumbent, counters, deadline))
+                     for _ in xrange(workers)]
+        for process in processes:
+            process.start()
+        reports = collect_reports(results, processes)  # before join(): a process can't exit, until its result is read
+        for process in processes:
+            process.join()
+    finally:
+        if instance is not None:
+            release_instance(instance.shared_name)
+    if not reports:
+        raise RuntimeError('all {} workers have failed, see their tracebacks above'.format(workers))
+
+    solution = Solution(task)
+    solution.metrics = {}
+    for own_cost, best_solution, completed, steps, metrics in reports:
+        if best_solution is not None and own_cost < solution.best_cost:
+            solution.best_cost = own_cost
+            solution.best_solution = best_solution
+        solution.steps += steps
+        for key, value in metrics.iteritems():
+            solution.metrics[key] = solution.metrics.get(key, 0) + value
+    solution.metrics['failed_workers'] = workers - len(reports)
+    # The tree is explored, if every subproblem was finished before the deadline
+    solution.proven_as_optimal = (counters[OUTSTANDING] == 0 and len(reports) == workers and
+                                  all(report[2] for report in reports))
+    return solution
+
+
+def collect_reports(results, processes):
+    # Reports of the workers. A worker, that has died (e.g. killed for memory), gives none, and we don't wait for it
+    reports = []
+    while len(reports) < len(processes):
+        try:
+            reports.append(results.get(timeout=POLL_INTERVAL))
+        except Empty:
+            if not any(process.is_alive() for process in processes) and results.empty():
+                break
+    return reports
+
+
+if __name__ == '__main__':
+    from reader import read_input
+    for fn in ['sc_157_0', 'sc_330_0', 'sc_1000_11']:
+        print '=== {} ==='.format(fn)
+        solution = parallel_search(read_input(fn), timeout=0.5*60)
+        print solution.best_cost, solution.proven_as_optimal, solution.steps, solution.metrics
@@ -3,67 +3,153 @@
 import sys
 from time import time as now
 
+from anytime import Improvement
+from cp_estimator import Estimator
+from cp_lp import presolve as lp_presolve
 from cp_state import State
+from solution_store import instance_key, to_solution
 
 
 class Solution(object):
-    def __init__(self, task):
+    def __init__(self, task, on_improvement=None):
         self.best_cost = sys.maxint  # Larger than any cost, that we can take
         self.best_solution = None
         self.set_count = task.set_count
         self.proven_as_optimal = False
         self.steps = 0
+        self.started = now()
+        self.history = []  # [(seconds since start, cost)] of every improvement
+        self.on_improvement = on_improvement  # gets anytime.Improvement of every improvement and of the proof
 
     def store_result(self, state):
         if state.current_cost < self.best_cost:
             print self.steps, 'update solution to', state.current_cost  # uncomment this to see the progress
             solution = [0] * self.set_count
-            state_on_stack = state
-            while state_on_stack:
-                for s in state_on_stack.chosen_sets:
-                    solution[s] = 1
-                state_on_stack = state_on_stack.parent
-
-            self.best_solution = solution
-            self.best_cost = state.current_cost
+            for s in state.chosen_sets:
+                solution[s] = 1
+            self.store_solution(solution, state.current_cost)
+
+    def store_solution(self, solution, cost):
+        self.best_solution = solution
+        self.best_cost = cost
+        self.history.append((now() - self.started, cost))
+        if self.on_improvement is not None:
+            self.on_improvement(Improvement(now() - self.started, cost, solution, False))
+
+    def prove_optimal(self):
+        self.proven_as_optimal = True
+        if self.on_improvement is not None and self.best_solution is not None:
+            self.on_improvement(Improvement(now() - self.started, self.best_cost, self.best_solution, True))
 
     def __repr__(self):
         return 'Solution(cost={}, optimal={}, steps={}, sets={})'.format(
             self.best_cost, self.proven_as_optimal, self.steps, self.best_solution)
 
 
-def deep_search(task, timeout=10*60):
-    state = State.from_task(task)
-    solution = Solution(task)
-    solution.metrics = state.estimator.metrics
+def deep_search(task, timeout=10*60, estimator_class=Estimator, items_class=set, dominance=False, presolve=False,
+                stats=None, store=None, on_improvement=None):
+    # store is solution_store.SolutionStore or None: it gives the first incumbent and gets the found one
+    # on_improvement(anytime.Improvement) is called on every better solution and on the proof of the last one
     deadline = now() + timeout
+    key = known = None
+    if store is not None:
+        key = instance_key(task)
+        known = store.get(key, task)
+        if known is not None and known.proven_as_optimal:
+            solution = Solution(task, on_improvement)
+            solution.store_solution(to_solution(known.chosen, task.set_count), known.cost)
+            solution.metrics = {}
+            solution.prove_optimal()
+            return solution
+
+    if presolve:  # LP relaxation at the root: the incumbent, the lower bound and fixed sets
+        if known is not None:
+            root = lp_presolve(task, known.cost, to_solution(known.chosen, task.set_count))
+        else:
+            root = lp_presolve(task)
+        if root.is_optimal:
+            solution = Solution(task, on_improvement)
+            solution.store_solution(root.solution, root.upper_bound)
+            solution.metrics = {'lower_bound': root.lower_bound, 'presolved_sets': len(root.task.sets)}
+            solution.prove_optimal()
+            save_solution(store, key, solution)
+            return solution
+        task = root.task
+
+    state = State.from_task(task, estimator_class, items_class, dominance)
+    solution = Solution(task, on_improvement)
+    solution.metrics = state.estimator.metrics
+    if presolve:
+        solution.store_solution(root.solution, root.upper_bound)
+        solution.metrics.update({'lower_bound': root.lower_bound, 'presolved_sets': len(task.sets)})
+        state.estimator.lower_bound = root.lower_bound
+        state.fix_sets((), [s for s in root.included if s in state.set2items])  # others are chosen or dominated
+    elif known is not None:
+        solution.store_solution(to_solution(known.chosen, task.set_count), known.cost)
+    if stats is not None:
+        stats.attach(state, solution)
+    if explore(state, solution, deadline, stats=stats):
+        solution.prove_optimal()  # we have not terminated on timeout, so we have explored all the tree
+    if stats is not None:
+        stats.finish()
+    save_solution(store, key, solution)
+    return solution
+
+
+def save_solution(store, key, solution):
+    # The store keeps it, only if it is better than the known one
+    if store is not None and solution.best_solution is not None:
+        store.update(key, solution.best_cost, solution.best_solution, solution.proven_as_optimal, 'deep_search')
+
+
+def explore(state, solution, deadline, on_step=None, stats=None):
+    # Search in the subtree of the state. Returns False, if we have stopped on the deadline
+    # on_step(state) is called on every step, e.g. to share the work with other processes.
+    # If it returns True, we stop as on the deadline
+    # stats is cp_stats.SearchStats (attached to the state) or None
 
     # Python has no tail-recursion optimization.
     # Even more, python has a limit on recursion depth
     # So, we need to write big loops iteratively
 
-    while state:  # when we try to .negate() init state we will obtain None and will exit from the loop
+    has_next = True
+    while has_next:  # when we try to .negate() init state we will obtain False and will exit from the loop
         solution.steps += 1
+        if on_step is not None and on_step(state):
+            return False
+        if stats is not None:
+            stats.on_node(state)
+
         if not state.is_feasible:
-            state = state.parent
+            if stats is not None:
+                stats.on_prune('infeasible')
+            has_next = state.negate()  # rollback to the last chosen set and try to deselect it
             continue
 
         if state.is_all_covered():
+            if stats is not None:
+                stats.on_prune('solution')
             solution.store_result(state)
-            state = state.negate()  # try to deselect the current set or rollback to the parent state
+            has_next = state.negate()  # try to deselect the current set or rollback to the parent state
             continue
 
-        if state.get_optimistic_cost() >= solution.best_cost:
+        if state.get_optimistic_cost(solution.best_cost) >= solution.best_cost:
             if now() > deadline:  # we get to this place often enough to stop in time,
                                   # and we get to it not on the each iteration, so we will not check the time too frequently
-                return solution
-            state = state.negate()  # try to deselect the current set or rollback to the parent state
+                return False
+            if stats is not None:
+                stats.on_prune('bound')
+            has_next = state.negate()  # try to deselect the current set or rollback to the parent state
             continue
 
-        state = state.next_child()
+        if state.fix_by_estimation(solution.best_cost):  # the estimator has proven some decisions for the subtree
+            if stats is not None:
+                stats.on_fixing()
+            continue  # check the changed state again
 
-    solution.proven_as_optimal = True  # we have not terminated on timeout, so we have explored all the tree
-    return solution
+        state.next_child()  # choose a set and go deeper
+
+    return True
 
 
 if __name__ == '__main__':
@@ -1,165 +1,298 @@
 #!/usr/bin/env python
 # encoding: utf-8
 from collections import defaultdict
+from time import time as now
 
+from cp_dominance import DominanceIndex
 from cp_estimator import Estimator
 
+# Kinds of records in the trail (undo log)
+SET_CHANGED = 0        # (SET_CHANGED, set_idx, items) - set2items[set_idx] was items, before the set was removed
+                       # or some of its items were covered. items is never changed in place, so we just put it back
+ITEM_COVERED = 1       # (ITEM_COVERED, item_idx, sets) - the item was removed from item2sets
+CANDIDATE_REMOVED = 2  # (CANDIDATE_REMOVED, item_idx, set_idx) - set_idx was removed from item2sets[item_idx]
+
+# A decision is a plain tuple (picked_set, decision, trail_mark, chosen_mark, cost): everything we need
+# to return to the moment before it. A namedtuple costs too much to make on every node
+
 
 class State(object):
-    def __init__(self, estimator, set2items, item2sets,
-                 parent=None, picked_set=None, decision=None):
+    # The only mutable search state.
+    # Instead of copying everything for every child, we change the state in place and write
+    # every change into the trail. On backtrack we undo the changes in the reverse order.
+    # So, memory grows with the search depth, not with depth * instance size.
+
+    def __init__(self, estimator, set2items, item2sets, items_class=set, dominance=None):
         # Don't use this constructor directly. Use .from_task() instead
-        self.estimator = estimator  # just copy the pointer from the parent for fast access
+        self.estimator = estimator  # just a pointer for fast access
+        self.items_class = items_class  # set() or a compatible class, e.g. cp_bitset.BitSet
         self.set2items = set2items  # {set_index: set(indexes of not covered items)}
         self.item2sets = item2sets  # {item_index: set(indexes of sets that can cover the item and have no decision yet)}
-        self.parent = parent        # parent state object
-        self.picked_set = picked_set  # picked set index
-        self.decision = decision    # whether we build picked_set or not
+        self.trail = []             # undo log, see the kinds of records above
+        self.decisions = []         # stack of decisions, the path from the root to the current state
+        self.floor = 0              # negate() doesn't go above this depth: decisions up to it are given
+        self.discrepancies = 0      # count of not chosen picked sets on the path
+        self.discrepancy_limit = None  # negate() doesn't make paths with more of them (limited discrepancy search)
+        self.limit_reached = False  # negate() has skipped a sibling because of the limit
+        self.chosen_sets = []       # all chosen sets on the path (picked and propagated ones)
+        self.changed_sets = set()   # sets, that have lost or got back items since the estimator has seen them
+        self.changed_items = set()  # items, that have been covered or have lost candidates (or vice versa)
+        self.dominance = dominance  # DominanceIndex, or None to skip the dominance checks
+        self.current_cost = 0
         self.is_feasible = True
-        if decision:
-            self.chosen_sets = {picked_set}
-        else:
-            self.chosen_sets = set()
-        self.propagate_constaints()
-        if self.is_feasible:
-            self.recalc_cost()
-
-    def recalc_cost(self):
-        additional = self.estimator.cost_of_chosen_list(self.chosen_sets)
-        if self.parent is None:
-            self.current_cost = additional
-        else:
-            self.current_cost = self.parent.current_cost + additional
+        self.propagate_on_toss(None)  # initial state: choose the sets, that can't be replaced
+        if self.dominance is not None:
+            self.remove_redundant_sets(list(self.set2items))
 
     @classmethod
-    def from_task(cls, task):
+    def from_task(cls, task, estimator_class=Estimator, items_class=set, dominance=False):
         # Make initial state
-        estimator = Estimator(task)
+        estimator = estimator_class(task)
 
-        set2items = {s.index: set(s.items) for s in task.sets}
+        set2items = {s.index: items_class(s.items) for s in task.sets}
         item2sets = defaultdict(set)
-        for set_idx, set_items in set2items.iteritems():
-            for item_idx in set_items:
-                item2sets[item_idx].add(set_idx)
+        for s in task.sets:
+            for item_idx in s.items:
+                item2sets[item_idx].add(s.index)
+
+        item2sets = dict(item2sets)
+        if dominance:
+            dominance = DominanceIndex(estimator.set_costs, set2items, item2sets)
+        else:
+            dominance = None
 
-        return cls(estimator, set2items, dict(item2sets),
-                   parent=None, picked_set=None, decision=False)
+        return cls(estimator, set2items, item2sets, items_class, dominance)
 
     def __repr__(self):
-        return 'State(picked={},chosen={})'.format(self.picked_set, self.decision)
+        return 'State(depth={},cost={})'.format(len(self.decisions), self.current_cost)
 
     # Search
 
     def next_child(self):
         picked_set = self.estimator.pick_a_set(self)
-        return self.create_child(picked_set, decision=True)
-
-    def create_child(self, picked_set, decision):
-        set2items = {s: i.copy() for s, i in self.set2items.iteritems()}  # Copy for mutating in child state
-        item2sets = {i: s.copy() for i, s in self.item2sets.iteritems()}  # TODO: Copy is expensive. Can we avoid it?
-        return self.__class__(self.estimator, set2items, item2sets,
-                              parent=self, picked_set=picked_set, decision=decision)
+        self.push(picked_set, decision=True)
 
     def negate(self):
-        # Generate sibling state, where picked_set is not chosen
+        # Go to the sibling state, where the last chosen picked_set is not chosen
         # If we already there, rollback to the parent state and repeat on it
-        state = self
-        while state:
-            if state.decision:
-                return state.parent.create_child(state.picked_set, decision=False)
+        # Returns False if we have reached the initial state, i.e. the search tree is exhausted
+        decisions = self.decisions
+        while len(decisions) > self.floor:
+            decision = decisions.pop()
+            self.rollback(decision)
+            if not decision[1]:
+                self.discrepancies -= 1
+            elif self.discrepancy_limit is not None and self.discrepancies >= self.discrepancy_limit:
+                self.limit_reached = True  # the sibling is left for the search with a greater limit
+            else:
+                self.push(decision[0], decision=False)
+                return True
+        return False
+
+    def push(self, picked_set, decision):
+        self.decisions.append((picked_set, decision, len(self.trail), len(self.chosen_sets), self.current_cost))
+        if decision:
+            self.propagate_on_choice(picked_set)
+        else:
+            self.discrepancies += 1
+            self.propagate_on_toss(picked_set)
+
+    def get_path(self):
+        return [decision[:2] for decision in self.decisions]
+
+    def replay(self, path):
+        # Go back to the initial state and repeat the decisions of the path.
+        # The path becomes given: negate() will search only in its subtree
+        if self.decisions:
+            self.rollback(self.decisions[0])
+            del self.decisions[:]
+        self.floor = 0
+        self.discrepancies = 0
+        for picked_set, decision in path:
+            if not self.is_feasible:
+                break
+            self.push(picked_set, decision)
+        self.floor = len(self.decisions)
+
+    def split_off(self):
+        # Give away the biggest unexplored part of our subtree: the sibling of the first chosen set.
+        # Returns the path to it or None. We will not search there anymore
+        for depth in xrange(self.floor, len(self.decisions)):
+            picked_set, decision = self.decisions[depth][:2]
+            if decision:
+                path = self.get_path()[:depth]
+                path.append((picked_set, False))
+                self.floor = depth + 1  # decisions above are not chosen ones, they have no siblings
+                return path
+        return None
+
+    def rollback(self, decision):
+        # Undo all the changes made since the decision was pushed
+        _, _, trail_mark, chosen_mark, cost = decision
+        trail = self.trail
+        set2items = self.set2items
+        item2sets = self.item2sets
+        changed_set = self.changed_sets.add
+        changed_item = self.changed_items.add
+        records = trail[trail_mark:]
+        del trail[trail_mark:]
+        for kind, key, value in reversed(records):
+            if kind == CANDIDATE_REMOVED:
+                item2sets[key].add(value)
+                changed_item(key)
+            elif kind == SET_CHANGED:
+                set2items[key] = value
+                changed_set(key)
             else:
-                state = state.parent
-        return None # if we have eventually got stat = None, it means that we are reached initial state
+                item2sets[key] = value
+                changed_item(key)
+        del self.chosen_sets[chosen_mark:]
+        self.current_cost = cost
+        self.is_feasible = True
 
     # Constraints propagation
 
-    def propagate_constaints(self):
-        if self.decision:
-            self.propagate_on_choice()
+    def propagate_on_choice(self, picked_set):
+        self.on_sets_chosen([picked_set])
+
+    def propagate_on_toss(self, picked_set):
+        if picked_set is None:  # "if we are at the init state"
+            orphaned_items = self.item2sets
         else:
-            self.propagate_on_toss()
-
-    def propagate_on_choice(self):
-        self.on_sets_chosen(self.chosen_sets)  # there is only one set in chosen_sets (picked_set)
-
-    def propagate_on_toss(self):
-        if self.picked_set is not None:  # "if we are not at the init state"
-            orphaned_items = self.set2items.pop(self.picked_set)
-            for item_idx in orphaned_items:
-                sets = self.item2sets[item_idx]
-                sets.remove(self.picked_set)
-                if not sets:
-                    self.is_feasible = False
-                    # We can't cover the item.
-                    # No matter, what else. State doesn't lead to any feasible solutions
+            orphaned_items = self.toss_sets([picked_set])
+            if not self.is_feasible:
+                return
+
+            if self.dominance is not None:
+                orphaned_items |= self.remove_expensive_subsets(orphaned_items,
+                                                                self.estimator.cost_of_chosen(picked_set))
+                if not self.is_feasible:
                     return
 
-            # before = len(self.set2items)
-            # self.remove_expensive_subsets(orphaned_items,  # Too expensive calculations :o(
-            #                               self.estimator.cost_of_chosen(self.picked_set))
-            # after = len(self.set2items)
-            # if after != before:
-            #     self.estimator.metrics['cut_exp'] += 1
-            # else:
-            #     self.estimator.metrics['not_cut_exp'] += 1
-            # if not self.is_feasible:
-            #     self.estimator.metrics['rollback_exp'] += 1
-            #     return
-
         # Immediately set 1 for every set that can't be replaced with another set
-        required_sets = self.detect_required_sets()
-        self.chosen_sets.update(required_sets)
+        # Only orphaned items could lose candidates, so we don't look at the others
+        required_sets = self.detect_required_sets(orphaned_items)
+        self.on_sets_chosen(required_sets)
+
+    def toss_sets(self, sets):
+        # Exclude sets from the following search. Returns items, that have lost a candidate
+        orphaned_items = self.items_class()
+        for set_idx in sets:
+            items = self.remove_set(set_idx)
+            self.changed_items.update(items)
+            orphaned_items |= items
+            for item_idx in items:
+                candidates = self.item2sets[item_idx]
+                candidates.remove(set_idx)
+                self.trail.append((CANDIDATE_REMOVED, item_idx, set_idx))
+                if not candidates:
+                    self.is_feasible = False
+                    # We can't cover the item.
+                    # No matter, what else. State doesn't lead to any feasible solutions
+                    return orphaned_items
+        return orphaned_items
+
+    def fix_sets(self, excluded, included):
+        # Apply decisions, that the estimator has proven for the whole subtree (e.g. with reduced costs).
+        # They are written into the trail of the current decision, so they are undone together with it
+        orphaned_items = self.toss_sets(excluded)
+        if not self.is_feasible:
+            return
+        required_sets = self.detect_required_sets(orphaned_items)
+        required_sets.update(included)
         self.on_sets_chosen(required_sets)
 
-    def detect_required_sets(self):
+    def fix_by_estimation(self, upper_bound):
+        # Returns True, if the state has been changed
+        excluded, included = self.estimator.get_fixed_sets(self, upper_bound)
+        if not excluded and not included:
+            return False
+        self.fix_sets(excluded, included)
+        return True
+
+    def detect_required_sets(self, items):
         required_sets = set()
-        for item, sets in self.item2sets.iteritems():
+        for item in items:
+            sets = self.item2sets[item]
             if len(sets) == 1:  # only one set can cover this item
                 required_sets.update(sets)
         return required_sets
 
+    def remove_set(self, set_idx):
+        items = self.set2items.pop(set_idx)
+        self.trail.append((SET_CHANGED, set_idx, items))
+        self.changed_sets.add(set_idx)
+        return items
+
     def on_items_covered(self, to_remove):
+        self.changed_items.update(to_remove)
+        item2sets = self.item2sets
+        set2items = self.set2items
+        trail_append = self.trail.append
         overvalued_sets = set()
         for item in to_remove:
-            overvalued_sets.update(self.item2sets.pop(item))
-
-        for s in overvalued_sets & set(self.set2items):
-            items = self.set2items[s]
-            items -= to_remove
+            sets = item2sets.pop(item)
+            trail_append((ITEM_COVERED, item, sets))
+            overvalued_sets.update(sets)
+
+        # The sets get new objects with the rest of their items, the old ones go into the trail as they are
+        overvalued_sets.intersection_update(set2items)  # without the chosen ones
+        self.changed_sets.update(overvalued_sets)
+        shrunk_sets = []
+        for s in overvalued_sets:
+            items = set2items[s]
+            trail_append((SET_CHANGED, s, items))
+            items = items - to_remove
             if not items:
-                del self.set2items[s]
+                del set2items[s]
+            else:
+                set2items[s] = items
+                if self.dominance is not None:
+                    self.dominance.on_items_removed(s, items)
+                    shrunk_sets.append(s)
 
-        #before = len(self.set2items)
-        #self.remove_redundant_sets(overvalued_sets & set(self.set2items))  # expensive operation. Work good only on the large datasets
-        #after = len(self.set2items)
-        #if after < before:
-        #    print 'profit {}->{}'.format(before, after)
+        if shrunk_sets:
+            self.remove_redundant_sets(sorted(shrunk_sets))  # the same order with any items_class
 
     def remove_expensive_subsets(self, items, cost_limit):
         # We can cover items with the cost=cost_limit
         # But we don't do that. So, we don't want to cover the items with the more expensive sets
-        costs = self.estimator.set_costs
-
-        iter_items = iter(items)
-        candidates = list(self.item2sets[next(iter_items)])
-
-        for cand_idx in candidates:
-            if costs[cand_idx] >= cost_limit:
-                cand_items = self.set2items[cand_idx]
-                if len(cand_items) <= len(items) and cand_items <= items:
-                    del self.set2items[cand_idx]
-
-                    for item_idx in cand_items:
-                        sets = self.item2sets[item_idx]
-                        sets.remove(cand_idx)
-                        if not sets:
-                            self.is_feasible = False
-                            return  # We cant cover the item
+        # (any solution with them is not better than the same one with the set, which we have already explored)
+        start_time = now()
+        subsets = self.dominance.find_subsets(self, items, cost_limit)
+        orphaned_items = self.toss_sets(subsets)
+
+        metrics = self.estimator.metrics
+        metrics['cut_exp' if subsets else 'not_cut_exp'] += 1
+        metrics['expensive_subsets'] += len(subsets)
+        if not self.is_feasible:
+            metrics['rollback_exp'] += 1
+        metrics['dominance_time'] += now() - start_time
+        return orphaned_items
+
+    def remove_redundant_sets(self, sets):
+        # Remove sets, that are subsets of other sets, which are not more expensive
+        # Then choose sets, that have become the only cover of some item
+        start_time = now()
+        orphaned_items = self.items_class()
+        removed = 0
+        for set_idx in sets:
+            if set_idx in self.set2items and self.dominance.is_dominated(self, set_idx):
+                orphaned_items |= self.toss_sets([set_idx])  # it can't make the state infeasible
+                removed += 1
+
+        metrics = self.estimator.metrics
+        metrics['redundant_sets'] += removed
+        metrics['dominance_time'] += now() - start_time
+        if removed:
+            self.on_sets_chosen(self.detect_required_sets(orphaned_items))
 
     def on_sets_chosen(self, sets):
-        covered_items = set()
+        covered_items = self.items_class()
         for s in sets:
-            covered_items.update(self.set2items.pop(s))
+            covered_items.update(self.remove_set(s))
+            self.chosen_sets.append(s)
+            self.current_cost += self.estimator.cost_of_chosen(s)
 
         self.on_items_covered(covered_items)
 
@@ -168,14 +301,13 @@ class State(object):
     def is_all_covered(self):
         return not self.item2sets
 
-    def get_optimistic_cost(self):
-        return self.estimator.get_optimistic(self)
+    def get_optimistic_cost(self, upper_bound=None):
+        return self.estimator.get_optimistic(self, upper_bound)
 
 
 if __name__ == '__main__':
     from reader import read_input
-    from time import time as now
     state = State.from_task(read_input('sc_15_0'))
     # st = now()
-    # state.remove_redundant_sets()
+    # state.remove_redundant_sets(list(state.set2items))
     # print now() - st
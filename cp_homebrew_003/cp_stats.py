@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Instrumentation of the search: nodes/sec, time by phases, prunes by reason, histogram of depths
+and the timeline of improvements. It is off by default, switch it on with deep_search(task, stats=SearchStats()).
+With a stream, it writes a snapshot as a JSON line every period seconds and at the end of the search.
+"""
+import json
+import sys
+from time import time as now
+
+REPORT_PERIOD = 10.0  # seconds between snapshots in the stream
+CLOCK_PERIOD = 256    # how often (in nodes) we look at the clock
+
+
+class SearchStats(object):
+    def __init__(self, stream=None, period=REPORT_PERIOD):
+        self.stream = stream  # file-like object for JSON lines, or None
+        self.period = period
+        self.started = now()
+        self.last_report = (self.started, 0)  # (time, nodes) of the last snapshot, for nodes/sec
+        self.nodes = 0
+        # propagation - push() and rollback(), bounding - estimation and fixing by it, branching - pick_a_set()
+        self.times = {'propagation': 0.0, 'bounding': 0.0, 'branching': 0.0}
+        self.prunes = {'infeasible': 0, 'bound': 0, 'solution': 0}
+        self.fixings = 0  # states, changed by fix_by_estimation()
+        self.depths = []  # depths[d] - count of nodes at depth d
+        self.solution = None
+
+    def attach(self, state, solution):
+        # Wrap methods of the state, so the search loop doesn't pay for the timing, when stats are off
+        self.solution = solution
+        state.push = self.timed('propagation', state.push)
+        state.rollback = self.timed('propagation', state.rollback)
+        state.get_optimistic_cost = self.timed('bounding', state.get_optimistic_cost)
+        state.fix_by_estimation = self.timed('bounding', state.fix_by_estimation)
+        state.estimator.pick_a_set = self.timed('branching', state.estimator.pick_a_set)
+
+    def timed(self, phase, method):
+        times = self.times
+
+        def wrapper(*args, **kwargs):
+            start_time = now()
+            result = method(*args, **kwargs)
+            times[phase] += now() - start_time
+            return result
+        return wrapper
+
+    def on_node(self, state):
+        self.nodes += 1
+        depth = len(state.decisions)
+        depths = self.depths
+        if depth >= len(depths):
+            depths.extend([0] * (depth + 1 - len(depths)))
+        depths[depth] += 1
+        if self.stream is not None and self.nodes % CLOCK_PERIOD == 0 and now() - self.last_report[0] >= self.period:
+            self.report()
+
+    def on_prune(self, reason):
+        self.prunes[reason] += 1
+
+    def on_fixing(self):
+        self.fixings += 1
+
+    def snapshot(self):
+        current_time = now()
+        last_time, last_nodes = self.last_report
+        elapsed = current_time - self.started
+        solution = self.solution
+        has_solution = solution is not None and solution.best_solution is not None
+        return {
+            'elapsed': elapsed,
+            'nodes': self.nodes,
+            'nodes_per_sec': (self.nodes - last_nodes) / max(current_time - last_time, 1e-9),
+            'avg_nodes_per_sec': self.nodes / max(elapsed, 1e-9),
+            'times': self.times,
+            'prunes': self.prunes,
+            'fixings': self.fixings,
+            'depths': self.depths,
+            'best_cost': solution.best_cost if has_solution else None,
+            'improvements': solution.history if solution is not None else [],
+        }
+
+    def report(self, final=False):
+        line = self.snapshot()
+        line['final'] = final
+        self.last_report = (now(), self.nodes)
+        if self.stream is not None:
+            self.stream.write(json.dumps(line) + '\n')
+            self.stream.flush()
+        return line
+
+    def finish(self):
+        return self.report(final=True)
+
+
+if __name__ == '__main__':
+    from cp_solver import deep_search
+    from reader import read_input
+    deep_search(read_input('sc_1000_11'), timeout=30, stats=SearchStats(sys.stdout, period=5))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Other orders of the search, than the plain depth first search of deep_search().
+All of them take the same arguments, stop on the same deadline and return Solution.
+ * best_first_search - continue from the node with the least optimistic cost
+ * discrepancy_search - limited discrepancy search: at first the paths, where we go against pick_a_set() rarely
+ * restart_search - depth first search, restarted with random ties in pick_a_set() and a growing step limit
+"""
+from heapq import heappop, heappush
+from itertools import count
+from random import Random
+from time import time as now
+
+from cp_estimator import Estimator
+from cp_solver import Solution, deep_search, explore
+from cp_state import State
+
+MAX_OPEN = 10000      # max size of the open list of best_first_search
+FIRST_RUN = 1000      # steps of the first run of restart_search
+RUN_GROWTH = 1.5      # every next run is longer, so finally some run explores the whole tree
+
+
+def best_first_search(task, timeout=10*60, estimator_class=Estimator, items_class=set, dominance=False,
+                      max_open=MAX_OPEN, on_improvement=None):
+    state = State.from_task(task, estimator_class, items_class, dominance)
+    solution = Solution(task, on_improvement)
+    solution.metrics = state.estimator.metrics
+    solution.metrics['dived'] = 0
+    deadline = now() + timeout
+
+    # Nodes are paths of decisions. We dive from the best node to a leaf, like deep_search(),
+    # and leave the siblings of chosen sets in the open list. So, we find solutions early
+    # and replay a path once per dive, not once per node.
+    # Among equal bounds the deeper node goes first, it's closer to a solution
+    ticket = count()
+    open_list = [(0, 0, next(ticket), [])]  # [(optimistic cost, -depth, ticket, path)]
+    while open_list:
+        bound, _, _, path = heappop(open_list)
+        if bound >= solution.best_cost:
+            break  # the rest nodes are not better too
+        if now() > deadline:
+            return solution
+        state.replay(path)
+
+        while True:
+            if len(open_list) >= max_open:
+                # No room for siblings. Search the subtree in depth instead
+                solution.metrics['dived'] += 1
+                state.floor = len(state.decisions)  # the siblings above are in the open list already
+                if not explore(state, solution, deadline):
+                    return solution
+                break
+
+            solution.steps += 1
+            if not state.is_feasible:
+                break
+            if state.is_all_covered():
+                solution.store_result(state)
+                break
+            bound = state.get_optimistic_cost(solution.best_cost)
+            if bound >= solution.best_cost:
+                break
+            if state.fix_by_estimation(solution.best_cost):
+                continue  # check the changed state again
+            picked_set = state.estimator.pick_a_set(state)
+            sibling = state.get_path()
+            sibling.append((picked_set, False))
+            heappush(open_list, (bound, -len(sibling), next(ticket), sibling))
+            state.push(picked_set, decision=True)
+
+    solution.prove_optimal()  # we have not terminated on timeout, so we have explored all the tree
+    return solution
+
+
+def discrepancy_search(task, timeout=10*60, estimator_class=Estimator, items_class=set, dominance=False,
+                       on_improvement=None):
+    state = State.from_task(task, estimator_class, items_class, dominance)
+    solution = Solution(task, on_improvement)
+    solution.metrics = state.estimator.metrics
+    deadline = now() + timeout
+
+    # Discrepancy is a picked set, that is not chosen.
+    # Every iteration explores again the paths of the previous one, but with the better incumbent
+    limit = 0
+    while True:
+        solution.metrics['discrepancies'] = limit
+        state.discrepancy_limit = limit
+        state.limit_reached = False
+        if not explore(state, solution, deadline):
+            return solution
+        if not state.limit_reached:  # the limit has not cut anything, so we have explored all the tree
+            solution.prove_optimal()
+            return solution
+        limit += 1
+
+
+class StepLimit(object):
+    # on_step callback of explore(), that stops it after the given count of steps
+    def __init__(self, steps):
+        self.left = steps
+
+    def __call__(self, state):
+        self.left -= 1
+        return self.left < 0
+
+
+def restart_search(task, timeout=10*60, estimator_class=Estimator, items_class=set, dominance=False,
+                   seed=None, first_run=FIRST_RUN, growth=RUN_GROWTH, on_improvement=None):
+    state = State.from_task(task, estimator_class, items_class, dominance)
+    solution = Solution(task, on_improvement)
+    solution.metrics = state.estimator.metrics
+    solution.metrics['restarts'] = 0
+    deadline = now() + timeout
+    random = Random(seed)
+
+    run_steps = first_run
+    while True:
+        limit = StepLimit(run_steps)
+        if explore(state, solution, deadline, limit):
+            solution.prove_optimal()
+            return solution
+        if limit.left >= 0:  # stopped on the deadline
+            return solution
+        # The first run uses the ties of deep_search(), the next ones try other corners of the tree
+        solution.metrics['restarts'] += 1
+        state.replay([])
+        state.estimator.shuffle(random)
+        run_steps = int(run_steps * growth)
+
+
+STRATEGIES = [('dfs', deep_search), ('best_first', best_first_search),
+              ('discrepancy', discrepancy_search), ('restarts', restart_search)]
+
+
+if __name__ == '__main__':
+    from reader import read_input
+    task = read_input('sc_157_0')
+    for name, search in STRATEGIES:
+        print '=== {} ==='.format(name)
+        solution = search(task, timeout=0.5*60)
+        print solution.best_cost, solution.proven_as_optimal, solution.steps, solution.history
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Writers of the task for the external solvers (minizinc_001, cp_gecode_001).
+They write into the given file or pipe piece by piece, so the time is linear in the size of the task
+and we don't keep the whole text in memory.
+"""
+BUFFER_SIZE = 1 << 16
+
+
+def get_covering_sets(item_count, sets):
+    # [[indexes of sets with the item]] for every item
+    covering_sets = [[] for _ in xrange(item_count)]
+    for s in sets:
+        for item in s.items:
+            covering_sets[item].append(s.index)
+    return covering_sets
+
+
+def write_minizinc_data(item_count, set_count, sets, out):
+    # .dzn for minizinc_001/setCovering.mzn. Indexes of MiniZinc arrays start from 1.
+    # For every item we give the sets with it, so the model doesn't look for the item in every set
+    out.write('% automatically generated Minizinc data file\n')
+    out.write('nbItems = {};\n'.format(item_count))
+    out.write('nbSets = {};\n'.format(set_count))
+    out.write('weights = [ ')
+    out.write(', '.join(str(int(s.cost)) for s in sets))
+    out.write(' ];\n')
+    out.write('coveringSets = [ ')
+    for item, covering in enumerate(get_covering_sets(item_count, sets)):
+        if item:
+            out.write(', ')
+        out.write('{ ')
+        out.write(', '.join(str(set_idx + 1) for set_idx in covering))
+        out.write(' }')
+    out.write(' ];\n')
+
+
+def write_gecode_data(item_count, set_count, sets, out):
+    # The same format as the input of the task, for cp_gecode_001/set_cover
+    out.write('{} {}\n'.format(item_count, set_count))
+    for s in sets:
+        out.write(str(int(s.cost)))
+        out.write(' ')
+        out.write(' '.join(str(int(item)) for item in s.items))
+        out.write('\n')
+
+
+def export(writer, item_count, set_count, sets, data_file):
+    with open(data_file, 'w', BUFFER_SIZE) as out:
+        writer(item_count, set_count, sets, out)
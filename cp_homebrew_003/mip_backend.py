@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+The set cover MIP
+    min sum(cost[s] * x[s]),  sum(x[s] for sets s with item i) >= 1 for every item i,  x[s] in {0, 1}
+built in bulk from the columns of reader.Instance. They are the incidence matrix (items x sets) in CSC
+already: offsets are its column pointers, items are its row indexes. So the matrix is made from one copy
+of the columns, and a backend gets the whole model in a few calls, not a call per set and per item.
+
+Backends take the same model:
+ * GurobiBackend - gurobipy: all variables by one addVars(), all constraints by one addMConstr()
+ * HighsBackend - scipy.optimize.milp (HiGHS), open source and in process, no licence is needed (Python 3)
+ * CbcBackend - the cbc executable (from PATH or the one bundled with PuLP), open source, runs on Python 2
+   without numpy and scipy. The model is MPS text, written column by column right from the columns of Instance, once per build()
+backend.build(instance) gives the native model of the backend, backend.solve(model, time_limit, excluded)
+gives MipResult, excluded sets are fixed to 0 for this call only (the neighbourhood of LNS).
+The other options of solve() are for this call only too: cutoff - only solutions with the cost <= cutoff
+(nothing else in the neighbourhood gives INFEASIBLE), solution_limit - stop after so many solutions,
+start - [0|1] for every set, the MIP start. HighsBackend has no solution limit and no start, it ignores them.
+get_backends() gives every backend, that can run here, the preferred one first.
+
+    python mip_backend.py [instance ...] - prints the build time of every backend on every instance
+"""
+import os
+import shutil
+from collections import namedtuple
+from distutils.spawn import find_executable
+from tempfile import mkdtemp
+from time import time as now
+
+from backend import BackendRun
+
+try:
+    import numpy
+    from scipy.sparse import csc_matrix
+except ImportError:
+    numpy = None
+
+try:
+    from scipy.optimize import Bounds, LinearConstraint, milp
+except ImportError:  # old scipy without HiGHS
+    milp = None
+
+try:
+    import gurobipy as grb
+except ImportError:
+    grb = None
+
+try:
+    import pulp
+except ImportError:
+    pulp = None
+
+OPTIMAL, FEASIBLE, INFEASIBLE, NOT_SOLVED = 'optimal', 'feasible', 'infeasible', 'not_solved'
+MIP_GAP = 0.001  # 0.1% usually suffices
+CBC_GRACE = 10   # seconds for cbc to write its solution after its own time limit
+CUTOFF_TOLERANCE = 1e-6  # added to the cutoff, so solvers don't cut off a solution of exactly its cost
+
+# solution - [0|1] for every set or None, lower_bound - the proven bound or None
+MipResult = namedtuple('MipResult', ['status', 'cost', 'solution', 'lower_bound'])
+
+
+def cover_matrix(instance):
+    # The incidence matrix (items x sets), 1 for every item of every set
+    if numpy is None:
+        raise ImportError('the sparse model needs numpy and scipy')
+    # copies: columns of a cached instance are read-only mmap, and sum_duplicates() sorts in place
+    items = numpy.array(instance.items, dtype=numpy.int32, copy=True)
+    offsets = numpy.array(instance.offsets, dtype=numpy.int32, copy=True)
+    matrix = csc_matrix((numpy.ones(len(items)), items, offsets), shape=(instance.item_count, instance.set_count))
+    matrix.sum_duplicates()  # an item, that is written twice in a set, is covered once
+    matrix.data[:] = 1.0
+    return matrix
+
+
+class HighsBackend(object):
+    name = 'highs'
+
+    def __init__(self, mip_gap=MIP_GAP):
+        if milp is None:
+            raise ImportError('HighsBackend needs scipy >= 1.9')
+        self.mip_gap = mip_gap
+
+    def build(self, instance):
+        # The model is the arrays of milp(), HiGHS gets them on every solve()
+        costs = numpy.asarray(instance.costs, dtype=numpy.float64)
+        matrix = cover_matrix(instance)
+        return {'costs': costs, 'cover': LinearConstraint(matrix, 1.0, numpy.inf),
+                'integrality': numpy.ones(instance.set_count)}
+
+    def solve(self, model, time_limit=None, excluded=(), cutoff=None, solution_limit=None, start=None):
+        # milp() takes no solution limit and no start, the cutoff is a constraint on the cost
+        upper = numpy.ones(len(model['costs']))
+        upper[list(excluded)] = 0.0
+        options = {'mip_rel_gap': self.mip_gap}
+        if time_limit is not None:
+            options['time_limit'] = time_limit
+        constraints = [model['cover']]
+        if cutoff is not None:
+            constraints.append(LinearConstraint(model['costs'][numpy.newaxis], -numpy.inf, cutoff + CUTOFF_TOLERANCE))
+        result = milp(model['costs'], integrality=model['integrality'], bounds=Bounds(0.0, upper),
+                      constraints=constraints, options=options)
+        bound = getattr(result, 'mip_dual_bound', None)
+        if result.x is None:
+            return MipResult(INFEASIBLE if result.status == 2 else NOT_SOLVED, None, None, bound)
+        solution = [int(round(x)) for x in result.x]
+        cost = sum(set_cost for set_cost, taken in zip(model['costs'].tolist(), solution) if taken)  # without rounding errors
+        return MipResult(OPTIMAL if result.status == 0 else FEASIBLE, cost, solution, bound)
+
+
+def find_cbc():
+    # cbc from PATH, or the binary that PuLP ships with
+    path = find_executable('cbc')
+    if path is None and pulp is not None:
+        solver = pulp.PULP_CBC_CMD()
+        if solver.available():
+            path = solver.path
+    return path
+
+
+class CbcBackend(object):
+    name = 'cbc'
+
+    def __init__(self, mip_gap=MIP_GAP):
+        self.executable = find_cbc()
+        if self.executable is None:
+            raise ImportError('CbcBackend needs cbc in PATH or PuLP with its bundled cbc')
+        self.mip_gap = mip_gap
+
+    def build(self, instance):
+        # The model is the MPS text without BOUNDS, solve() adds them.
+        # Sets are the columns of the matrix already, so COLUMNS is written in their order
+        costs = list(instance.costs)
+        row_names = ['R{}'.format(item) for item in xrange(instance.item_count)]
+        lines = ['NAME setcover', 'ROWS', ' N  COST']
+        lines.extend(' G  ' + row for row in row_names)
+        lines.append('COLUMNS')
+        for set_idx in xrange(instance.set_count):
+            column = '    C{} '.format(set_idx)
+            lines.append(column + 'COST ' + repr(costs[set_idx]))
+            # an item, that is written twice in a set, is one entry of the column
+            lines.extend(column + row_names[item] + ' 1' for item in sorted(set(instance.items_of(set_idx))))
+        lines.append('RHS')
+        lines.extend('    RHS ' + row + ' 1' for row in row_names)
+        lines.append('')
+        return {'costs': costs, 'text': '\n'.join(lines)}
+
+    def solve(self, model, time_limit=None, excluded=(), cutoff=None, solution_limit=None, start=None):
+        excluded = set(excluded)
+        if start is not None and cutoff is not None and \
+                sum(set_cost for set_cost, taken in zip(model['costs'], start) if taken) > cutoff:
+            start = None  # cbc rejects it anyway
+
+        def write_model(out):
+            out.write(model['text'])
+            out.write('BOUNDS\n')
+            for set_idx in xrange(len(model['costs'])):
+                out.write(' FX BND C{} 0\n'.format(set_idx) if set_idx in excluded else ' BV BND C{}\n'.format(set_idx))
+            out.write('ENDATA\n')
+
+        command = [self.executable, 'model.mps', 'ratioGap', str(self.mip_gap)]
+        if time_limit is not None:
+            command.extend(['sec', str(time_limit)])
+        if cutoff is not None:
+            command.extend(['cutoff', repr(cutoff + CUTOFF_TOLERANCE)])
+        if solution_limit is not None:
+            command.extend(['maxSolutions', str(solution_limit)])
+        if start is not None:
+            # cbc 2.9 writes all zeros as the optimal solution, when the start is optimal already
+            # and the preprocessed model becomes infeasible. So no preprocessing with the start
+            command.extend(['mipStart', 'start.txt', 'preprocess', 'off'])
+        command.extend(['solve', 'solution', 'solution.txt'])
+        workdir = mkdtemp(prefix='setcover-')
+        try:
+            if start is not None:
+                write_cbc_start(os.path.join(workdir, 'start.txt'), start)
+            run = BackendRun(command, write_model, 'model.mps',
+                             time_limit + CBC_GRACE if time_limit is not None else None)
+            try:
+                output = run.run(workdir)
+            except KeyboardInterrupt:  # cbc is in its own process group, it doesn't get Ctrl-C
+                run.cancel()
+                raise
+            path = os.path.join(workdir, 'solution.txt')
+            if not os.path.isfile(path):
+                return MipResult(NOT_SOLVED, None, None, None)
+            with open(path) as solution_file:
+                header = solution_file.readline()
+                values = [line.split() for line in solution_file]
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return read_cbc_result(model['costs'], header, values, output.stdout)
+
+
+def write_cbc_start(path, start):
+    # The MIP start in the format of the solution file of cbc: the header, then a line per taken set
+    with open(path, 'w') as out:
+        out.write('Stopped on iterations - objective value 0\n')
+        for set_idx, taken in enumerate(start):
+            if taken:
+                out.write('{0} C{0} 1 0\n'.format(set_idx))
+
+
+def read_cbc_result(costs, header, values, stdout):
+    # header - the first line of the solution file, values - [index, name, value, reduced cost] of columns
+    if header.startswith(('Infeasible', 'Integer infeasible')):  # the latter, when the cutoff has cut everything
+        return MipResult(INFEASIBLE, None, None, None)
+    if not header.startswith(('Optimal', 'Stopped')) or 'no integer solution' in header:
+        return MipResult(NOT_SOLVED, None, None, None)
+    solution = [0] * len(costs)
+    for fields in values:
+        solution[int(fields[0])] = int(round(float(fields[2])))
+    cost = sum(set_cost for set_cost, taken in zip(costs, solution) if taken)
+    bound = None
+    for line in stdout.splitlines():
+        if line.startswith('Lower bound:'):
+            bound = float(line.split(':')[1])
+    if header.startswith('Optimal'):
+        return MipResult(OPTIMAL, cost, solution, bound if bound is not None else cost)
+    return MipResult(FEASIBLE, cost, solution, bound)
+
+
+class GurobiBackend(object):
+    name = 'gurobi'
+
+    def __init__(self, mip_gap=MIP_GAP, threads=None, param_file=None, output=False):
+        if grb is None:
+            raise ImportError('GurobiBackend needs gurobipy')
+        self.mip_gap = mip_gap
+        self.threads = threads
+        self.param_file = param_file  # e.g. the tuned parameters of lns_mip, read after the defaults
+        self.output = output          # whether Gurobi prints its log
+
+    def build(self, instance, name='setcover'):
+        # The pair (model, variables) of lns_mip, variables in the order of sets
+        model = grb.Model(name)
+        costs = numpy.asarray(instance.costs, dtype=numpy.float64)
+        model.addVars(instance.set_count, obj=costs.tolist(), vtype=grb.GRB.BINARY, name='s')
+        model.update()
+        # x=None - all variables of the model, in the order of their creation
+        model.addMConstr(cover_matrix(instance), None, grb.GRB.GREATER_EQUAL, numpy.ones(instance.item_count))
+        model.setAttr('ModelSense', grb.GRB.MINIMIZE)
+        if self.param_file is not None:
+            model.read(self.param_file)
+        model.setParam('MIPGap', self.mip_gap)
+        if self.threads is not None:
+            model.setParam('Threads', self.threads)
+        model.setParam('OutputFlag', int(self.output))
+        model.update()
+        return model, model.getVars()
+
+    def solve(self, model, time_limit=None, excluded=(), cutoff=None, solution_limit=None, start=None):
+        g_model, variables = model
+        g_model.setParam('TimeLimit', time_limit if time_limit is not None else grb.GRB.INFINITY)
+        g_model.setParam('Cutoff', cutoff + CUTOFF_TOLERANCE if cutoff is not None else grb.GRB.INFINITY)
+        g_model.setParam('SolutionLimit', solution_limit if solution_limit is not None else grb.GRB.MAXINT)
+        fixed = [variables[set_idx] for set_idx in excluded]
+        g_model.setAttr('UB', fixed, [0.0] * len(fixed))
+        if start is not None:
+            g_model.setAttr('Start', variables, [float(taken) for taken in start])
+        try:
+            g_model.optimize()
+        finally:
+            g_model.setAttr('UB', fixed, [1.0] * len(fixed))
+            if start is not None:
+                g_model.setAttr('Start', variables, [grb.GRB.UNDEFINED] * len(variables))
+        status = g_model.status
+        bound = g_model.objbound if g_model.solcount else None
+        if status == grb.GRB.INTERRUPTED:  # Ctrl-C, like the other backends
+            raise KeyboardInterrupt()
+        if status in (grb.GRB.INFEASIBLE, grb.GRB.CUTOFF):
+            return MipResult(INFEASIBLE, None, None, None)
+        if not g_model.solcount:
+            return MipResult(NOT_SOLVED, None, None, bound)
+        solution = [int(round(x)) for x in g_model.getAttr('X', variables)]
+        return MipResult(OPTIMAL if status == grb.GRB.OPTIMAL else FEASIBLE, g_model.objval, solution, bound)
+
+
+def get_backends(options=None):
+    # Every backend, that can run here, the preferred one first.
+    # options - {backend name: keyword arguments of its class}
+    options = options or {}
+    backends = []
+    for backend_class in (GurobiBackend, HighsBackend, CbcBackend):
+        try:
+            backends.append(backend_class(**options.get(backend_class.name, {})))
+        except ImportError:
+            pass
+    return backends
+
+
+def build_with_loops(instance):
+    # The old way of lns_mip create_model(): the sets of every item, gathered in Python loops.
+    # The baseline of the benchmark, it needs no backend
+    covered_by = [[] for _ in xrange(instance.item_count)]
+    costs = []
+    for set_idx in xrange(instance.set_count):
+        costs.append(instance.costs[set_idx])
+        for item in instance.items_of(set_idx):
+            covered_by[item].append(set_idx)
+    return costs, covered_by
+
+
+def build_gurobi_with_loops(instance):
+    # The old create_model() of lns_mip: a call per set and a quicksum per item, for the benchmark
+    model = grb.Model('setcover')
+    covered_by = [[] for _ in xrange(instance.item_count)]
+    variables = []
+    for set_idx in xrange(instance.set_count):
+        variables.append(model.addVar(obj=instance.costs[set_idx], vtype=grb.GRB.BINARY, name='s_{0}'.format(set_idx)))
+        for item in instance.items_of(set_idx):
+            covered_by[item].append(variables[set_idx])
+    model.update()
+    for item in xrange(instance.item_count):
+        model.addConstr(grb.quicksum(covered_by[item]) >= 1)
+    model.update()
+    return model, variables
+
+
+def print_build_times(filenames=('sc_1000_11', 'sc_5000_1', 'sc_10000_5', 'sc_10000_2', 'sc_63009_0')):
+    # loops - only the Python loops of the old builder, gurobi-loops - the whole old builder
+    from reader import read_instance
+    builders = [('loops', build_with_loops)]
+    if grb is not None:
+        builders.append(('gurobi-loops', build_gurobi_with_loops))
+    builders.extend((backend.name, backend.build) for backend in get_backends())
+    print '{:<12} {:>8} {:>8} {}'.format('instance', 'sets', 'pairs', ' '.join(
+        '{:>12}'.format(name) for name, _ in builders))
+    for fn in filenames:
+        instance = read_instance(fn)
+        times = []
+        for _, build in builders:
+            started = now()
+            build(instance)
+            times.append(now() - started)
+        print '{:<12} {:>8} {:>8} {}'.format(fn, instance.set_count, len(instance.items),
+                                             ' '.join('{:>11.3f}s'.format(seconds) for seconds in times))
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        print_build_times(sys.argv[1:])
+    else:
+        print_build_times()
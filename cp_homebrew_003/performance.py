@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 # encoding: utf-8
+from sys import getsizeof
 from time import time as now
 
 from reader import read_input, list_files
@@ -17,6 +18,82 @@ def print_durations(solver=bruteforce_solver, min_task_size=0, max_task_size=20)
         print '{:<15}'.format(fn), '{:.4f}'.format(measure_duration(fn, solver))
 
 
+def measure_items_memory(state):
+    # Bytes taken by the containers of not covered items of all sets
+    return sum(getsizeof(items) for items in state.set2items.itervalues())
+
+
+def print_representations(files, timeout=60, items_classes=None):
+    # Compare memory and search speed of the different representations of State.set2items
+    from cp_bitset import BitSet
+    from cp_solver import deep_search
+    from cp_state import State
+    for fn in files:
+        task = read_input(fn)
+        for items_class in items_classes or (set, BitSet):
+            memory = measure_items_memory(State.from_task(task, items_class=items_class))
+            start_time = now()
+            solution = deep_search(task, timeout, items_class=items_class)
+            duration = now() - start_time
+            print '{:<15} {:<8} {:>8} KB {:>10.1f} nodes/sec, cost={}'.format(
+                fn, items_class.__name__, memory // 1024, solution.steps / duration, solution.best_cost)
+
+
+def print_speedups(files, worker_counts=(1, 2, 4, 8), timeout=60):
+    # Speedup of parallel_search() versus count of workers.
+    # If the instance is proven in time, the speedup is by duration, otherwise it is by nodes/sec
+    from cp_parallel import parallel_search
+    for fn in files:
+        task = read_input(fn)
+        base = None
+        for workers in worker_counts:
+            start_time = now()
+            solution = parallel_search(task, timeout, workers)
+            duration = now() - start_time
+            speed = solution.steps / duration
+            measure = duration if solution.proven_as_optimal else 1.0 / speed
+            if base is None:
+                base = measure
+            print '{:<15} {:>3} workers {:>8.1f} sec {:>10.1f} nodes/sec, cost={}, optimal={}, speedup={:.2f}'.format(
+                fn, workers, duration, speed, solution.best_cost, solution.proven_as_optimal, base / measure)
+
+
+def print_strategies(files, timeout=60, strategies=None):
+    # Time to the first solution, to the best one and to the proof of optimality for every search strategy
+    from cp_strategies import STRATEGIES
+    for fn in files:
+        task = read_input(fn)
+        for name, search in strategies or STRATEGIES:
+            start_time = now()
+            solution = search(task, timeout)
+            duration = now() - start_time
+            first_time, first_cost = solution.history[0] if solution.history else (None, None)
+            best_time = solution.history[-1][0] if solution.history else None
+            print '{:<15} {:<12} first={} at {}, best={} at {}, proven={}, {:.1f} sec, {} steps'.format(
+                fn, name, first_cost, first_time, solution.best_cost, best_time,
+                solution.proven_as_optimal, duration, solution.steps)
+
+
+def print_estimators(files, timeout=60, estimators=None):
+    # Nodes/sec, the best cost and the time to the proof for every estimator of deep_search()
+    from cp_estimator import Estimator
+    from cp_lagrangian import LagrangianEstimator
+    from cp_solver import deep_search
+    for fn in files:
+        task = read_input(fn)
+        for estimator_class in estimators or (Estimator, LagrangianEstimator):
+            start_time = now()
+            solution = deep_search(task, timeout, estimator_class=estimator_class)
+            duration = now() - start_time
+            print '{:<15} {:<20} {:>8.1f} sec {:>10.1f} nodes/sec, cost={}, optimal={}'.format(
+                fn, estimator_class.__name__, duration, solution.steps / duration, solution.best_cost,
+                solution.proven_as_optimal)
+
+
 if __name__ == '__main__':
     from cp_solver import deep_search
     print_durations(lambda(task): deep_search(task).best_solution, max_task_size=50)  # Put your solver and your size bounds here
+    # print_strategies(['sc_157_0', 'sc_330_0', 'sc_1000_11'])
+    # print_speedups(['sc_157_0', 'sc_330_0', 'sc_1000_11'])
+    # print_estimators(['sc_45_0', 'sc_157_0', 'sc_330_0', 'sc_1000_11'])
+    # print_representations(['sc_157_0', 'sc_1165_0', 'sc_2241_0', 'sc_4413_0', 'sc_6931_0', 'sc_10370_0'])  # airline instances
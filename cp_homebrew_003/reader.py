@@ -1,17 +1,164 @@
 #!/usr/bin/env python
 # encoding: utf-8
+from array import array
 from collections import namedtuple
+import hashlib
+import mmap
 import os
 import re
+import struct
 import sys
+import tempfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 Set = namedtuple("Set", ['index', 'cost', 'items'])
 Task = namedtuple('Task', ['item_count', 'set_count', 'sets'])
 
 DATA_ROOT = os.path.realpath(os.path.join(__file__, '../../data'))
+CACHE_ROOT = os.path.join(DATA_ROOT, '.cache')  # binary copies of instances, see read_instance()
+CACHE_MAGIC = b'SCI1'
+CACHE_HEADER = struct.Struct('=4sIII')  # magic, item_count, set_count, count of (set, item) pairs
+SHARED_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()  # see share_instance()
+
+
+class Instance(object):
+    """
+    The task in columns (like CSR sparse matrix), without an object for every set:
+     costs[s] - cost of the set s
+     items[offsets[s]:offsets[s+1]] - items of the set s
+     item_sets[item_offsets[i]:item_offsets[i+1]] - sets with the item i (made on the first use)
+    """
+    def __init__(self, item_count, set_count, costs, offsets, items):
+        self.item_count = item_count
+        self.set_count = set_count
+        self.costs = costs
+        self.offsets = offsets
+        self.items = items
+        self._item_offsets = None
+        self._item_sets = None
+        self.shared_name = None  # name of the shared memory, if the columns are there, see share_instance()
+
+    @classmethod
+    def from_task(cls, task):
+        # Only the whole task: sets must have indexes 0..set_count-1
+        if len(task.sets) != task.set_count:
+            raise ValueError('some sets of the task are missing')
+        costs = array('d', (s.cost for s in task.sets))
+        offsets = array('i', [0])
+        items = array('i')
+        for s in task.sets:
+            items.extend(s.items)
+            offsets.append(len(items))
+        return cls(task.item_count, task.set_count, costs, offsets, items)
+
+    def __reduce__(self):
+        # A shared instance is pickled by its name: other processes attach to the same memory
+        if self.shared_name is not None:
+            return attach_instance, (self.shared_name,)
+        return Instance, (self.item_count, self.set_count,
+                          array('d', self.costs), array('i', self.offsets), array('i', self.items))
+
+    def items_of(self, set_idx):
+        return self.items[self.offsets[set_idx]:self.offsets[set_idx + 1]]
+
+    def sets_of(self, item_idx):
+        item_offsets = self.item_offsets
+        return self.item_sets[item_offsets[item_idx]:item_offsets[item_idx + 1]]
+
+    @property
+    def item_offsets(self):
+        if self._item_offsets is None:
+            self.transpose()
+        return self._item_offsets
+
+    @property
+    def item_sets(self):
+        if self._item_sets is None:
+            self.transpose()
+        return self._item_sets
+
+    def transpose(self):
+        # Counting sort of (item, set) pairs by item
+        counts = [0] * (self.item_count + 1)
+        for item in self.items:
+            counts[item + 1] += 1
+        for i in xrange(self.item_count):
+            counts[i + 1] += counts[i]
+        item_offsets = array('i', counts)
+
+        item_sets = array('i', [0]) * len(self.items)
+        offsets = self.offsets
+        items = self.items
+        for set_idx in xrange(self.set_count):
+            for pos in xrange(offsets[set_idx], offsets[set_idx + 1]):
+                item = items[pos]
+                item_sets[counts[item]] = set_idx
+                counts[item] += 1
+        self._item_offsets = item_offsets
+        self._item_sets = item_sets
+
+    def to_task(self):
+        # For the code, that works with Task and Set
+        costs = self.costs
+        return Task(self.item_count, self.set_count,
+                    [Set(s, float(costs[s]), self.items_of(s).tolist()) for s in xrange(self.set_count)])
+
+    def as_task(self):
+        # The same Task, but its sets are made on access from the columns, without copying them all
+        return Task(self.item_count, self.set_count, SetsView(self))
+
+
+class SetsView(object):
+    # Read-only sequence of Set over the columns of Instance
+    def __init__(self, instance):
+        self.instance = instance
+
+    def __len__(self):
+        return self.instance.set_count
+
+    def __getitem__(self, set_idx):
+        if set_idx < 0:
+            set_idx += len(self)
+        if not 0 <= set_idx < len(self):
+            raise IndexError(set_idx)
+        instance = self.instance
+        # Plain ints: a mapped column can be a numpy array, and its int32 items overflow in the bit shifts of BitSet
+        return Set(set_idx, float(instance.costs[set_idx]), instance.items_of(set_idx).tolist())
+
+    def __iter__(self):
+        for set_idx in xrange(len(self)):
+            yield self[set_idx]
+
+
+def parse_instance(input_data):
+    # Splitting the whole input at once is not faster in CPython, and needs a list of all tokens in memory.
+    # So, we split it by lines, and only items of one line are in a list at a time
+    lines = input_data.split('\n')
+
+    parts = lines[0].split()
+    item_count = int(parts[0])
+    set_count = int(parts[1])
+
+    costs = array('d')
+    offsets = array('i', [0])
+    items = array('i')
+    pairs = 0
+    for line in lines[1:set_count+1]:
+        parts = line.split()
+        costs.append(float(parts[0]))
+        items.fromlist(map(int, parts[1:]))
+        pairs += len(parts) - 1
+        offsets.append(pairs)
+
+    return Instance(item_count, set_count, costs, offsets, items)
 
 
 def parse_input(input_data):
+    # Straight into Task and Set: going through the columns of parse_instance() would only add a copy
     lines = input_data.split('\n')
 
     parts = lines[0].split()
@@ -26,10 +173,126 @@ def parse_input(input_data):
     return Task(item_count, set_count, sets)
 
 
-def read_input(filename):
-    path =  os.path.join(DATA_ROOT, filename)
-    with open(path) as f:
-        return parse_input(f.read())
+def mapped_array(buf, offset, count, typecode):
+    # Read-only array over the mapped file. Without copying, where Python can do it
+    size = array(typecode).itemsize * count
+    if hasattr(memoryview, 'cast'):  # Python 3
+        return memoryview(buf)[offset:offset + size].cast(typecode)
+    if numpy is not None:
+        return numpy.frombuffer(buf, numpy.dtype(typecode), count, offset)
+    column = array(typecode)
+    column.fromstring(buf[offset:offset + size])
+    return column
+
+
+def get_cache_path(filename, data):
+    # Keyed by the content, so a changed file gets a new cache
+    return os.path.join(CACHE_ROOT, '{}.{}.bin'.format(filename, hashlib.sha1(data).hexdigest()))
+
+
+def write_cache(instance, path):
+    if not os.path.isdir(CACHE_ROOT):
+        os.makedirs(CACHE_ROOT)
+    prefix = os.path.basename(path).split('.')[0] + '.'
+    for fn in os.listdir(CACHE_ROOT):  # caches of the old versions of the file
+        if fn.startswith(prefix) and fn.endswith('.bin'):
+            os.remove(os.path.join(CACHE_ROOT, fn))
+    write_columns(instance, path)
+
+
+def write_columns(instance, path):
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, instance.item_count, instance.set_count, len(instance.items)))
+        for column in (instance.costs, instance.offsets, instance.items, instance.item_offsets, instance.item_sets):
+            column.tofile(f)
+    os.rename(tmp_path, path)  # other processes never see a half-written file
+
+
+def map_cache(path):
+    # The pages of the file are shared between all processes, that have mapped it.
+    # Returns None for a truncated or broken file
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < CACHE_HEADER.size:
+            return None
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, item_count, set_count, pairs = CACHE_HEADER.unpack_from(buf)
+    layout = (('d', set_count), ('i', set_count + 1), ('i', pairs), ('i', item_count + 1), ('i', pairs))
+    if magic != CACHE_MAGIC or len(buf) != CACHE_HEADER.size + sum(array(t).itemsize * n for t, n in layout):
+        buf.close()
+        return None
+
+    columns = []
+    offset = CACHE_HEADER.size
+    for typecode, count in layout:
+        columns.append(mapped_array(buf, offset, count, typecode))
+        offset += array(typecode).itemsize * count
+    if columns[1][set_count] != pairs or columns[3][item_count] != pairs:
+        return None
+    instance = Instance(item_count, set_count, *columns[:3])
+    instance._item_offsets, instance._item_sets = columns[3:]
+    return instance
+
+
+def share_instance(instance, name=None):
+    # Put the columns into a named shared memory (a file in /dev/shm) and map them.
+    # Other processes get the instance by attach_instance(name), or just by pickling of it.
+    # The owner calls release_instance(name), when the workers have attached
+    if name is None:
+        name = 'setcover-{}-{}'.format(os.getpid(), id(instance))
+    write_columns(instance, os.path.join(SHARED_ROOT, name))
+    return attach_instance(name)
+
+
+def attach_instance(name):
+    instance = map_cache(os.path.join(SHARED_ROOT, name))
+    instance.shared_name = name
+    return instance
+
+
+def release_instance(name):
+    # The memory is freed, when the last process unmaps it
+    try:
+        os.remove(os.path.join(SHARED_ROOT, name))
+    except OSError:
+        pass
+
+
+def read_instance(filename, cache=True):
+    path = os.path.join(DATA_ROOT, filename)
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not cache:
+        return parse_instance(data)
+
+    cache_path = get_cache_path(filename, data)
+    if os.path.exists(cache_path):
+        instance = map_cache(cache_path)
+        if instance is not None:
+            return instance
+        try:  # truncated or broken, it is written again below
+            os.remove(cache_path)
+        except OSError:
+            pass
+
+    instance = parse_instance(data)
+    try:
+        write_cache(instance, cache_path)
+    except (IOError, OSError):  # e.g. read-only data/, we will parse the file next time too
+        pass
+    return instance
+
+
+def read_input(filename, cache=True):
+    return read_instance(filename, cache).to_task()
+
+
+def parse_output(output_data):
+    # The output of solve_it(): "cost is_optimal" and [0|1] for every set -> (cost, is_optimal, solution)
+    lines = output_data.strip().split('\n')
+    parts = lines[0].split()
+    solution = map(int, lines[1].split()) if len(lines) > 1 else []
+    return float(parts[0]), bool(int(parts[1])), solution
 
 
 def get_size(filename):
@@ -41,6 +304,6 @@ def get_size(filename):
 
 
 def list_files(min_size=0, max_size=sys.maxint):
-    files = sorted((get_size(fn), fn) for fn in os.listdir(DATA_ROOT))
+    files = sorted((get_size(fn), fn) for fn in os.listdir(DATA_ROOT) if not fn.startswith('.'))  # skip the cache
     return [fn for f_size, fn in files
             if fn is not None and min_size <= f_size <=max_size]
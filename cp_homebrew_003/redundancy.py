@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Post-pass for any solution: a chosen set is redundant, if every its item is covered by other chosen sets.
+Coverage counts, how many chosen sets cover every item, so the cost and the feasibility of the solution
+are known in O(1), and adding or removing a set costs O(its size).
+remove_redundant() drops redundant sets, the most expensive first, in O(count of (set, item) pairs) total.
+"""
+
+
+class Coverage(object):
+    # Sets of the task must have indexes 0..set_count-1
+    def __init__(self, task, chosen=()):
+        self.sets = task.sets
+        self.counts = [0] * task.item_count  # counts[item] - count of chosen sets with the item
+        self.not_covered = task.item_count
+        self.cost = 0
+        self.chosen = set()
+        for set_idx in chosen:
+            self.add(set_idx)
+
+    def add(self, set_idx):
+        s = self.sets[set_idx]
+        counts = self.counts
+        for item in set(s.items):
+            if not counts[item]:
+                self.not_covered -= 1
+            counts[item] += 1
+        self.cost += s.cost
+        self.chosen.add(set_idx)
+
+    def remove(self, set_idx):
+        s = self.sets[set_idx]
+        counts = self.counts
+        for item in set(s.items):
+            counts[item] -= 1
+            if not counts[item]:
+                self.not_covered += 1
+        self.cost -= s.cost
+        self.chosen.discard(set_idx)
+
+    def is_redundant(self, set_idx):
+        counts = self.counts
+        return all(counts[item] > 1 for item in self.sets[set_idx].items)
+
+    def is_feasible(self):
+        return self.not_covered == 0
+
+
+def remove_redundant(task, chosen):
+    # chosen - indexes of chosen sets. Returns indexes of the sets, that are left
+    coverage = Coverage(task, chosen)
+    for set_idx in sorted(coverage.chosen, key=lambda s: (-task.sets[s].cost, s)):
+        if coverage.is_redundant(set_idx):
+            coverage.remove(set_idx)
+    return sorted(coverage.chosen)
+
+
+def prune_solution(task, solution):
+    # For solve_it(): [0|1] for every set -> (cost, [0|1] for every set) without redundant sets
+    chosen = remove_redundant(task, [set_idx for set_idx, taken in enumerate(solution) if taken])
+    pruned = [0] * len(solution)
+    for set_idx in chosen:
+        pruned[set_idx] = 1
+    return sum(task.sets[set_idx].cost for set_idx in chosen), pruned
+
+
+if __name__ == '__main__':
+    from time import time as now
+    from reader import read_input
+    for fn in ['sc_157_0', 'sc_1000_11', 'sc_5000_1', 'sc_10000_5', 'sc_10000_2']:
+        task = read_input(fn)
+        sorted_sets = sorted(task.sets, key=lambda s: s.cost / len(s.items) if s.items else s.cost)
+        coverage = Coverage(task)
+        for s in sorted_sets:  # greedy_001
+            coverage.add(s.index)
+            if coverage.is_feasible():
+                break
+        greedy_cost = coverage.cost
+        start_time = now()
+        kept = remove_redundant(task, coverage.chosen)
+        print '{:<12} greedy_001 {} sets, cost {} -> {} sets, cost {} in {:.4f}s'.format(
+            fn, len(coverage.chosen), greedy_cost, len(kept), sum(task.sets[s].cost for s in kept), now() - start_time)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+The best known solutions of instances, kept between runs in data/.solutions.json.
+Instances are keyed by the hash of their content, not by the file name. A solver seeds its incumbent
+from the store and writes its improvements back, so every next run starts from the best one so far.
+Updates are atomic: under a lock the file is read again, and the new version replaces it by rename.
+"""
+import hashlib
+import json
+import os
+from collections import namedtuple
+from time import time as now
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locks, the rename is still atomic
+    fcntl = None
+
+from reader import DATA_ROOT
+
+STORE_PATH = os.path.join(DATA_ROOT, '.solutions.json')
+
+# chosen - indexes of the chosen sets
+StoredSolution = namedtuple('StoredSolution', ['cost', 'chosen', 'proven_as_optimal', 'solver', 'updated'])
+
+
+def instance_key(task):
+    # The same key for the same sets, whatever file or format the task has been read from.
+    # Costs are hashed exactly (repr of the float): the input format of exporter.py rounds them to int
+    digest = hashlib.sha1()
+    digest.update('{} {}\n'.format(task.item_count, task.set_count))
+    for s in task.sets:
+        digest.update(repr(float(s.cost)))
+        digest.update(' ')
+        digest.update(' '.join(str(int(item)) for item in s.items))
+        digest.update('\n')
+    return digest.hexdigest()
+
+
+def to_chosen(solution):
+    # [0|1] for every set -> indexes of chosen sets
+    return [set_idx for set_idx, taken in enumerate(solution) if taken]
+
+
+def to_solution(chosen, set_count):
+    solution = [0] * set_count
+    for set_idx in chosen:
+        solution[set_idx] = 1
+    return solution
+
+
+def is_cover(task, stored):
+    # Don't trust the file: it could be written for another version of the instance or by hand
+    if any(set_idx >= task.set_count for set_idx in stored.chosen):
+        return False
+    sets = {s.index: s for s in task.sets}
+    covered = set()
+    for set_idx in stored.chosen:
+        covered.update(sets[set_idx].items)
+    cost = sum(sets[set_idx].cost for set_idx in stored.chosen)
+    return len(covered) == task.item_count and cost == stored.cost
+
+
+class SolutionStore(object):
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, ValueError):  # no store yet or a broken file
+            return {}
+
+    def get(self, key, task=None):
+        # StoredSolution or None. With the task, we check that it is a cover with the stored cost
+        record = self.load().get(key)
+        if record is None:
+            return None
+        stored = StoredSolution(**record)
+        if task is not None and not is_cover(task, stored):
+            return None
+        return stored
+
+    def update(self, key, cost, solution, proven_as_optimal=False, solver=None):
+        # Stores the solution ([0|1] for every set), if it is better than the known one or proves it.
+        # Returns True, if the store has been changed. On a read-only data/ nothing is stored, and it returns False
+        try:
+            lock = open(self.path + '.lock', 'a')
+        except IOError:
+            return False
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            records = self.load()
+            known = records.get(key)
+            if known is not None and (known['cost'] < cost or
+                                      known['cost'] == cost and (known['proven_as_optimal'] or not proven_as_optimal)):
+                return False
+            records[key] = StoredSolution(cost, to_chosen(solution), proven_as_optimal, solver, now())._asdict()
+            tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(records, f)
+                os.rename(tmp_path, self.path)  # readers never see a half-written file
+            except (IOError, OSError):  # e.g. the disk is full, the old file is kept
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return False
+            return True
+        finally:
+            lock.close()  # releases the lock
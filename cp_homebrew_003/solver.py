@@ -14,11 +14,16 @@ Further search is not so productive and does not improve solutions significantly
 import sys
 from reader import parse_input
 from cp_solver import deep_search
+from redundancy import prune_solution
 
 
-def solve_it(input_data, timeout=10*60):
+def solve_it(input_data, timeout=10*60, presolve=False, store=None):
+    # presolve=True starts the search with the LP relaxation, see cp_lp.py
+    # store=SolutionStore() starts from the best known solution and keeps the found one, see solution_store.py
     task = parse_input(input_data)
-    solution = deep_search(task, timeout)
+    solution = deep_search(task, timeout, presolve=presolve, store=store)
+    if not solution.proven_as_optimal:  # found before the timeout, it can have sets, that are covered by others
+        solution.best_cost, solution.best_solution = prune_solution(task, solution.best_solution)
     # prepare the solution in the specified output format
     return '{} {}\n{}'.format(int(solution.best_cost),          # from float
                               int(solution.proven_as_optimal),  # from boolean
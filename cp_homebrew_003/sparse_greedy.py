@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Greedy over the sparse 0/1 matrix of the instance (reader.Instance), made for heuristics, that run it many times.
+The matrix is converted once, a run chooses columns until every item is covered:
+ * COST_PER_ITEM - the least cost / count of items of the set (the rule of greedy_001), fixed for the whole run
+ * COST_PER_NEW_ITEM - the least cost / count of not covered items of the set (Chvatal's rule)
+Sets, that cover nothing new, are skipped. Ties go to the set with the least index.
+With random (GRASP), every step picks a random set of the restricted candidate list instead of the best one:
+sets, whose score (the inverse ratio, items per cost) is at least best - alpha * (best - worst).
+alpha=0 gives random ties only, alpha=1 - any set, that covers something new.
+After a choice, the counts of not covered items are updated for all sets at once: the sets of newly
+covered items are gathered from the item -> sets index and subtracted with numpy.bincount.
+Without numpy, the same runs are done by a lazy heap in pure Python.
+"""
+from heapq import heapify, heappop, heappush
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+COST_PER_ITEM = 'cost_per_item'
+COST_PER_NEW_ITEM = 'cost_per_new_item'
+RULES = (COST_PER_ITEM, COST_PER_NEW_ITEM)
+
+
+def candidate_threshold(best, worst, alpha):
+    # The largest ratio in the restricted candidate list
+    if not best or not alpha:
+        return best  # free sets go first
+    return max(best, 1.0 / ((1 - alpha) / best + alpha / worst))  # not below best by rounding
+
+
+class SparseGreedy(object):
+    def __init__(self, instance):
+        if numpy is None:
+            raise ImportError('SparseGreedy needs numpy, use make_greedy()')
+        self.item_count = instance.item_count
+        self.set_count = instance.set_count
+        self.costs = numpy.array(instance.costs, dtype=numpy.float64)
+        self.offsets = numpy.array(instance.offsets, dtype=numpy.intp)
+        self.items = numpy.array(instance.items, dtype=numpy.intp)
+        self.item_offsets = numpy.array(instance.item_offsets, dtype=numpy.intp)
+        self.item_sets = numpy.array(instance.item_sets, dtype=numpy.intp)
+        self.sizes = numpy.diff(self.offsets)
+
+    def sets_of(self, items):
+        # Sets of all the given items, one entry per (item, set) pair
+        starts = self.item_offsets[items]
+        lengths = self.item_offsets[items + 1] - starts
+        total = lengths.sum()
+        if not total:
+            return self.item_sets[:0]
+        # positions starts[k]..starts[k]+lengths[k]-1 for every k, without a Python loop
+        shifts = numpy.repeat(starts - numpy.cumsum(lengths) + lengths, lengths)
+        return self.item_sets[shifts + numpy.arange(total)]
+
+    def run(self, rule=COST_PER_NEW_ITEM, costs=None, random=None, alpha=0.0):
+        # Returns indexes of chosen sets in the order of choice.
+        # costs - other costs of sets for the choice (e.g. noised or inf for excluded sets), the same by default.
+        # random - random.Random for the restricted candidate list, None - the best set on every step
+        if costs is None:
+            costs = self.costs
+        new = self.sizes.astype(numpy.float64)  # counts of not covered items
+        covered = numpy.zeros(self.item_count, dtype=bool)
+        not_covered = self.item_count
+        static = numpy.where(new > 0, costs / numpy.maximum(new, 1), numpy.inf) if rule == COST_PER_ITEM else None
+        ratios = numpy.empty(self.set_count)
+        chosen = []
+        while not_covered:
+            if static is None:
+                numpy.divide(costs, new, out=ratios, where=new > 0)
+                ratios[new == 0] = numpy.inf
+            else:
+                ratios = numpy.where(new > 0, static, numpy.inf)
+            set_idx = int(numpy.argmin(ratios))
+            best = ratios[set_idx]
+            if best == numpy.inf:
+                break  # nothing covers the rest items
+            if random is not None:
+                worst = ratios[ratios < numpy.inf].max()
+                candidates = numpy.flatnonzero(ratios <= candidate_threshold(best, worst, alpha))
+                set_idx = int(candidates[random.randrange(len(candidates))])
+            set_items = self.items[self.offsets[set_idx]:self.offsets[set_idx + 1]]
+            fresh = numpy.unique(set_items[~covered[set_items]])
+            covered[fresh] = True
+            not_covered -= len(fresh)
+            new -= numpy.bincount(self.sets_of(fresh), minlength=self.set_count)
+            chosen.append(set_idx)
+        return chosen
+
+
+class PurePythonGreedy(object):
+    # The same runs without numpy: scores can only grow, so the heap keeps old ones and re-scores the top
+    def __init__(self, instance):
+        self.item_count = instance.item_count
+        self.set_count = instance.set_count
+        self.costs = list(instance.costs)
+        self.set_items = [sorted(set(instance.items_of(s))) for s in xrange(instance.set_count)]
+        self.item_sets = [[] for _ in xrange(instance.item_count)]
+        for set_idx, items in enumerate(self.set_items):
+            for item in items:
+                self.item_sets[item].append(set_idx)
+
+    def run(self, rule=COST_PER_NEW_ITEM, costs=None, random=None, alpha=0.0):
+        if random is not None:
+            return self.run_randomized(rule, costs, random, alpha)
+        if costs is None:
+            costs = self.costs
+        new = [len(items) for items in self.set_items]
+        static = rule == COST_PER_ITEM
+        heap = [(costs[s] / new[s], s) for s in xrange(self.set_count) if new[s]]
+        heapify(heap)
+        covered = [False] * self.item_count
+        not_covered = self.item_count
+        chosen = []
+        while not_covered and heap:
+            ratio, set_idx = heappop(heap)
+            if not new[set_idx]:
+                continue
+            if not static:
+                actual = costs[set_idx] / new[set_idx]
+                if actual != ratio:
+                    heappush(heap, (actual, set_idx))
+                    continue
+            chosen.append(set_idx)
+            for item in self.set_items[set_idx]:
+                if not covered[item]:
+                    covered[item] = True
+                    not_covered -= 1
+                    for other_idx in self.item_sets[item]:
+                        new[other_idx] -= 1
+        return chosen
+
+    def run_randomized(self, rule, costs, random, alpha):
+        # The candidate list needs the worst ratio too. The max-heap gets every new ratio (ratios only grow),
+        # so its top is the worst one, after dropping older entries
+        if costs is None:
+            costs = self.costs
+        set_items = self.set_items
+        new = [len(items) for items in set_items]
+        static = rule == COST_PER_ITEM
+
+        def ratio(s):
+            return costs[s] / (len(set_items[s]) if static else new[s])
+
+        lowest = [(ratio(s), s) for s in xrange(self.set_count) if new[s]]
+        heapify(lowest)
+        highest = [(-value, s) for value, s in lowest]
+        heapify(highest)
+        covered = [False] * self.item_count
+        not_covered = self.item_count
+        chosen = []
+        while not_covered:
+            while highest and (not new[highest[0][1]] or -highest[0][0] != ratio(highest[0][1])):
+                heappop(highest)
+            if not highest:
+                break  # nothing covers the rest items
+            worst = -highest[0][0]
+            candidates = []
+            threshold = None
+            while lowest and (threshold is None or lowest[0][0] <= threshold):
+                value, s = heappop(lowest)
+                if not new[s]:
+                    continue
+                actual = ratio(s)
+                if actual != value:
+                    heappush(lowest, (actual, s))
+                    continue
+                if threshold is None:  # the best one
+                    threshold = candidate_threshold(value, worst, alpha)
+                candidates.append(s)
+            set_idx = candidates.pop(random.randrange(len(candidates)))
+            for s in candidates:
+                heappush(lowest, (ratio(s), s))
+            chosen.append(set_idx)
+            for item in set_items[set_idx]:
+                if not covered[item]:
+                    covered[item] = True
+                    not_covered -= 1
+                    for other_idx in self.item_sets[item]:
+                        new[other_idx] -= 1
+                        if new[other_idx] and not static:
+                            heappush(highest, (-ratio(other_idx), other_idx))
+        return chosen
+
+
+def make_greedy(instance):
+    return SparseGreedy(instance) if numpy is not None else PurePythonGreedy(instance)
+
+
+if __name__ == '__main__':
+    from time import time as now
+    from reader import read_instance
+    for fn in ['sc_1000_11', 'sc_5000_1', 'sc_10000_5', 'sc_10000_2']:
+        instance = read_instance(fn)
+        for greedy_class in [SparseGreedy, PurePythonGreedy]:
+            greedy = greedy_class(instance)
+            for rule in RULES:
+                start_time = now()
+                chosen = greedy.run(rule)
+                print '{:<12} {:<17} {:<17} cost={} sets={} {:.4f}s'.format(
+                    fn, greedy_class.__name__, rule, sum(instance.costs[s] for s in chosen), len(chosen),
+                    now() - start_time)
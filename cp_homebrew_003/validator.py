@@ -75,6 +75,48 @@ def check_solver(solver, inputs=list_files(max_size=20)):
         print 'OK: solution for {fn} is optimal, cost={cost}'.format(fn=fn, cost=cost)
 
 
+def check_stream(solver, inputs=('sc_157_0', 'sc_1000_11'), timeout=10):
+    """
+    The last cost, that an anytime solver streams, must be the cost it returns
+    :param function(task, timeout, on_improvement) solver: returns a result with .cost
+    :return:
+    """
+    for fn in inputs:
+        task = read_input(fn)
+        improvements = []
+        result = solver(task, timeout, on_improvement=improvements.append)
+        if not improvements:
+            print 'ERROR: {fn}: nothing streamed, returned cost={cost}'.format(fn=fn, cost=result.cost)
+        elif improvements[-1].cost != result.cost:
+            print 'ERROR: {fn}: the last streamed cost={streamed}, but returned cost={cost}'.format(
+                fn=fn, streamed=improvements[-1].cost, cost=result.cost)
+        else:
+            print 'OK: {fn}: streamed {count} improvements, the last one cost={cost}'.format(
+                fn=fn, count=len(improvements), cost=result.cost)
+
+
+def check_parallel(inputs=('sc_25_0', 'sc_27_0'), workers=2, timeout=60):
+    """
+    parallel_search() hands the task to workers in shared memory (numpy columns, if numpy is installed).
+    With BitSet and the dominance index, it must prove the same cost as deep_search()
+    :return:
+    """
+    from cp_bitset import BitSet
+    from cp_parallel import parallel_search
+    from cp_solver import deep_search
+    for fn in inputs:
+        task = read_input(fn)
+        control = deep_search(task, timeout)
+        solution = parallel_search(task, timeout, workers, items_class=BitSet, dominance=True)
+        if not is_valid(task, solution.best_solution):
+            print 'ERROR: solution for {fn} is invalid: {solution}'.format(fn=fn, solution=solution.best_solution)
+        elif solution.best_cost != control.best_cost or not solution.proven_as_optimal:
+            print 'ERROR: {fn}: parallel cost={cost} (proven={proven}), but deep_search() cost={control_cost}'.format(
+                fn=fn, cost=solution.best_cost, proven=solution.proven_as_optimal, control_cost=control.best_cost)
+        else:
+            print 'OK: {fn}: parallel cost={cost} is proven'.format(fn=fn, cost=solution.best_cost)
+
+
 if __name__ == '__main__':
     from cp_solver import deep_search
     check_solver(lambda (task): deep_search(task).best_solution)  # put your solver here
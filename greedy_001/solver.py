@@ -24,24 +24,17 @@
 # THE SOFTWARE.
 
 
-from collections import namedtuple
-
-Set = namedtuple("Set", ['index', 'cost', 'items'])
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.reader import Task, parse_input  # Set(index, cost, items) is there too
+from cp_homebrew_003.redundancy import prune_solution
 
 def solve_it(input_data):
     # Modify this code to run your optimization algorithm
 
     # parse the input
-    lines = input_data.split('\n')
-
-    parts = lines[0].split()
-    item_count = int(parts[0])
-    set_count = int(parts[1])
-    
-    sets = []
-    for i in range(1, set_count+1):
-        parts = lines[i].split()
-        sets.append(Set(i-1, float(parts[0]), map(int, parts[1:])))
+    item_count, set_count, sets = parse_input(input_data)
 
     # build a trivial solution
     # pick add sets one-by-one until all the items are covered
@@ -55,8 +48,8 @@ def solve_it(input_data):
         if len(coverted) >= item_count:
             break
         
-    # calculate the cost of the solution
-    obj = sum([s.cost*solution[s.index] for s in sets])
+    # drop sets, that are covered by others, and calculate the cost of the solution
+    obj, solution = prune_solution(Task(item_count, set_count, sets), solution)
 
     # prepare the solution in the specified output format
     output_data = str(obj) + ' ' + str(0) + '\n'
@@ -0,0 +1,141 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+GRASP (greedy randomized adaptive search) on the greedy of cp_homebrew_003/sparse_greedy.py.
+Every construction is that greedy (Chvatal's rule by default), but on every step it picks a random set from
+the restricted candidate list: sets, whose count of new items per cost is at least best - alpha * (best - worst).
+alpha=0 is the plain greedy with random ties, alpha=1 is a random cover.
+The counts of not covered items are updated incrementally, as in the plain greedy.
+Then redundant sets are removed. Constructions are run by a pool of processes until the time is over,
+every worker has its own seed, and the best cover is kept.
+
+    python grasp.py ./data/sc_10000_5 [seconds] [workers]
+"""
+
+import os
+import sys
+from collections import namedtuple
+from multiprocessing import Pool, cpu_count
+from random import Random
+from time import time as now
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.anytime import Incumbent
+from cp_homebrew_003.reader import Instance, parse_input, release_instance, share_instance
+from cp_homebrew_003.redundancy import remove_redundant
+from cp_homebrew_003.sparse_greedy import COST_PER_NEW_ITEM, make_greedy
+
+ALPHA = 0.1
+TIMEOUT = 10
+
+# Per worker: count of constructions, the best cost and chosen sets, seconds of work
+WorkerReport = namedtuple('WorkerReport', ['worker', 'seed', 'constructions', 'best_cost', 'chosen', 'elapsed'])
+GraspResult = namedtuple('GraspResult', ['cost', 'chosen', 'reports'])
+
+
+class Constructor(object):
+    # Randomized greedy constructions on one task (or reader.Instance)
+    def __init__(self, task, rule=COST_PER_NEW_ITEM, alpha=ALPHA):
+        instance = task if isinstance(task, Instance) else Instance.from_task(task)
+        self.greedy = make_greedy(instance)
+        self.rule = rule
+        self.alpha = alpha
+        self.costs = list(instance.costs)
+        self.task = instance.to_task()  # sets are made once, for remove_redundant()
+
+    def construct(self, random):
+        # Returns indexes of chosen sets, without redundant ones
+        return remove_redundant(self.task, self.greedy.run(self.rule, random=random, alpha=self.alpha))
+
+
+def grasp_worker(args):
+    task, worker, seed, deadline, rule, alpha = args  # the task is an Instance, attached to the shared memory
+    started = now()
+    constructor = Constructor(task, rule, alpha)
+    random = Random(seed)
+    constructions = 0
+    best_cost, best_chosen = float('inf'), None
+    while True:
+        chosen = constructor.construct(random)
+        constructions += 1
+        cost = sum(constructor.costs[set_idx] for set_idx in chosen)
+        if cost < best_cost:
+            best_cost, best_chosen = cost, chosen
+        if now() > deadline:  # at least one construction, even with a tiny timeout
+            break
+    return WorkerReport(worker, seed, constructions, best_cost, best_chosen, now() - started)
+
+
+def grasp_search(task, timeout=TIMEOUT, on_improvement=None, seed=None, rule=COST_PER_NEW_ITEM, alpha=ALPHA):
+    # The anytime interface, in one process: on_improvement(anytime.Improvement) gets every better cover.
+    # Returns the Incumbent
+    constructor = Constructor(task, rule, alpha)
+    random = Random(seed)
+    incumbent = Incumbent(task.set_count, on_improvement)
+    deadline = now() + timeout
+    while True:
+        chosen = constructor.construct(random)
+        incumbent.offer_chosen(sum(constructor.costs[set_idx] for set_idx in chosen), chosen)
+        if now() > deadline:
+            break
+    return incumbent
+
+
+def grasp(task, timeout=TIMEOUT, workers=None, seed=None, rule=COST_PER_NEW_ITEM, alpha=ALPHA):
+    workers = workers or cpu_count()
+    seeds = Random(seed)
+    # Workers attach to the columns of the task in shared memory, instead of getting a copy of every set
+    instance = share_instance(Instance.from_task(task))
+    deadline = now() + timeout
+    pool = Pool(workers)
+    try:
+        reports = pool.map(grasp_worker, [(instance, worker, seeds.randint(0, sys.maxint), deadline, rule, alpha)
+                                          for worker in xrange(workers)])
+    finally:
+        pool.close()
+        pool.join()
+        release_instance(instance.shared_name)
+    best = min(reports, key=lambda report: report.best_cost)
+    return GraspResult(best.best_cost, best.chosen, reports)
+
+
+def solve_it(input_data, timeout=TIMEOUT, workers=None, seed=None):
+    task = parse_input(input_data)
+    result = grasp(task, timeout, workers, seed)
+
+    solution = [0]*task.set_count
+    for set_idx in result.chosen:
+        solution[set_idx] = 1
+
+    # prepare the solution in the specified output format
+    output_data = str(result.cost) + ' ' + str(0) + '\n'
+    output_data += ' '.join(map(str, solution))
+
+    return output_data
+
+
+def print_throughput(task, timeout=TIMEOUT, workers_list=(1, 2, 4), seed=0):
+    for workers in workers_list:
+        result = grasp(task, timeout, workers, seed)
+        total = sum(report.constructions for report in result.reports)
+        print 'workers={} best={} constructions={} ({:.1f}/sec)'.format(
+            workers, result.cost, total, total / float(timeout))
+        for report in result.reports:
+            print '  worker {}: {} constructions in {:.2f}s ({:.1f}/sec), best {}'.format(
+                report.worker, report.constructions, report.elapsed, report.constructions / report.elapsed,
+                report.best_cost)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        timeout = float(sys.argv[2]) if len(sys.argv) > 2 else TIMEOUT
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        input_data_file = open(file_location, 'r')
+        input_data = ''.join(input_data_file.readlines())
+        input_data_file.close()
+        print 'Solving:', file_location
+        print solve_it(input_data, timeout, workers)
+    else:
+        print 'This test requires an input file.  Please select one from the data directory. (i.e. python grasp.py ./data/sc_6_1)'
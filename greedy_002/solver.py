@@ -24,43 +24,84 @@
 # THE SOFTWARE.
 
 
-from collections import namedtuple
+import os
+import sys
+from heapq import heapify, heappop, heappush
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.anytime import Incumbent
+from cp_homebrew_003.reader import Task, parse_input  # Set(index, cost, items) is there too
+from cp_homebrew_003.redundancy import prune_solution, remove_redundant
+
+
+def largest_cover_score(cost, new):
+    # The rule of this solver: the largest cost * count of newly covered items
+    return cost * new
+
+
+def chvatal_score(cost, new):
+    # Chvatal's rule: the least cost per newly covered item
+    return float(new) / cost if cost else float('inf')
+
 
-Set = namedtuple("Set", ['index', 'cost', 'items'])
+def lazy_greedy(item_count, sets, score=largest_cover_score):
+    # Picks the set with the largest score(cost, count of its not covered items), until all items are covered.
+    # A score can only fall, when items get covered. So, the heap keeps old scores, and the popped set is
+    # re-scored: if its score hasn't changed, no other set is better, otherwise it goes back to the heap.
+    # Ties go to the set with the least index, like in the stable sort of the original version
+    item_sets = [[] for _ in xrange(item_count)]
+    new = []  # new[set_idx] - count of its not covered items
+    for s in sets:
+        items = set(s.items)
+        new.append(len(items))
+        for item in items:
+            item_sets[item].append(s.index)
 
-def solve_it(input_data):
+    heap = [(-score(s.cost, new[s.index]), s.index) for s in sets if new[s.index]]
+    heapify(heap)
+    covered = [False] * item_count
+    not_covered = item_count
+    chosen = []
+    while not_covered and heap:
+        old_score, set_idx = heappop(heap)
+        if not new[set_idx]:
+            continue  # everything is covered by others
+        s = sets[set_idx]
+        actual_score = -score(s.cost, new[set_idx])
+        if actual_score != old_score:
+            heappush(heap, (actual_score, set_idx))
+            continue
+        chosen.append(set_idx)
+        for item in s.items:
+            if not covered[item]:
+                covered[item] = True
+                not_covered -= 1
+                for other_idx in item_sets[item]:
+                    new[other_idx] -= 1
+    return chosen
+
+
+def greedy(task, timeout=None, on_improvement=None, score=largest_cover_score):
+    # The anytime interface: the greedy cover without redundant sets is the only improvement.
+    # Returns indexes of its sets
+    chosen = remove_redundant(task, lazy_greedy(task.item_count, task.sets, score))
+    Incumbent(task.set_count, on_improvement).offer_chosen(sum(task.sets[set_idx].cost for set_idx in chosen), chosen)
+    return chosen
+
+
+def solve_it(input_data, score=largest_cover_score):
     # Modify this code to run your optimization algorithm
 
     # parse the input
-    lines = input_data.split('\n')
-
-    parts = lines[0].split()
-    item_count = int(parts[0])
-    set_count = int(parts[1])
-    
-    sets = []
-    for i in range(1, set_count+1):
-        parts = lines[i].split()
-        sets.append(Set(i-1, float(parts[0]), map(int, parts[1:])))
-
-    # build a trivial solution
-    # pick add sets one-by-one until all the items are covered
+    item_count, set_count, sets = parse_input(input_data)
+
+    # pick sets one-by-one until all the items are covered
     solution = [0]*set_count
-    coverted = set()
-    
-    while len(coverted) < item_count:
-        sorted_sets = sorted(sets, key=lambda s: -s.cost*len(set(s.items)-coverted) if len(set(s.items)-coverted) > 0 else s.cost)
-        #print coverted
-        #print [-s.cost*len(set(s.items)-coverted) for s in sorted_sets]
-        #print sorted_sets
-        for s in sorted_sets:
-            if solution[s.index] < 1:
-                solution[s.index] = 1
-                coverted |= set(s.items)
-                break;
-        
-    # calculate the cost of the solution
-    obj = sum([s.cost*solution[s.index] for s in sets])
+    for set_idx in lazy_greedy(item_count, sets, score):
+        solution[set_idx] = 1
+
+    # drop sets, that are covered by others, and calculate the cost of the solution
+    obj, solution = prune_solution(Task(item_count, set_count, sets), solution)
 
     # prepare the solution in the specified output format
     output_data = str(obj) + ' ' + str(0) + '\n'
@@ -68,7 +109,6 @@ def solve_it(input_data):
 
     return output_data
 
-
 import sys
 
 if __name__ == '__main__':
@@ -7,12 +7,17 @@ Large neighborhood search for set cover based on a MIP solver.
 Includes an adaptive neighborhood size.
 """
 
+import os
 import random
 import sys
-import gurobipy as grb
-import mip as m
-
-def large_neighborhood(model):
+from time import time as now
+import mip as m  # the sibling module, before the root is in the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.anytime import Incumbent
+from cp_homebrew_003.mip_backend import INFEASIBLE, OPTIMAL
+from cp_homebrew_003.solution_store import SolutionStore, instance_key, to_solution
+
+def large_neighborhood(model, solution_store=None, task=None, on_improvement=None, timeout=None):
   """
   Solves a set cover instance with large-neighborhood search.
 
@@ -21,6 +26,13 @@ def large_neighborhood(model):
 
   Args:
     model: The set cover MIP model as created by mip.create_model().
+    solution_store: The store of the best known solutions, its solution
+      is the start of the search, and improvements are written there.
+    task: The task of the model as created by mip.to_task(), needed
+      with the store only.
+    on_improvement: Gets the anytime.Improvement of every better
+      solution, and of the proof of optimality.
+    timeout: Time for the search in s. (default: Until Ctrl-C)
   """
   # Time limit per MIP call in s
   TIMELIMIT = 3
@@ -28,78 +40,76 @@ def large_neighborhood(model):
   FIX_RATIO = 0.9
   
   SAMPLE_SIZE = 30
-  FEASIBLE_COUNT = 0
-  INFEASIBLE_COUNT = 0
-
-
-  g_model, vars = model
-  g_model.setParam("OutputFlag", 0)
-  g_model.setParam("TimeLimit", len(vars)*0.05)
-
-  print("Processing " + g_model.getAttr("ModelName"))
-
-  # Warmup
-  g_model.optimize()
-  print("Initial solution: {0}".format(g_model.objval))
-  m.write(model)
-  #g_model.setParam("SolutionLimit", 2147483647)
-  g_model.setParam("TimeLimit", TIMELIMIT)
-  
-  best_obj = g_model.objval
-  best_sol = {var:int(var.x) for var in vars}
-  obj_constraint = g_model.addConstr(g_model.getObjective() <= best_obj - 1)
-  
-  if g_model.status != grb.GRB.OPTIMAL:
-    while g_model.status != grb.GRB.INTERRUPTED:
-      # Add the additional constraints as described above
-      added_constraints = []
-      for var in vars:
-        if best_sol[var] == 0 and random.random() < FIX_RATIO:
-          added_constraints.append(g_model.addConstr(var == best_sol[var]))
-
-      g_model.optimize()
-
-      # Remove the additional constraints again
-      for constraint in added_constraints:
-        g_model.remove(constraint)
-
-      #print g_model.status
-      if g_model.status != grb.GRB.INFEASIBLE:
-        FEASIBLE_COUNT += 1;
-        if g_model.objval < best_obj:
-          sys.stdout.write("\nNext solution:    {0}\n".format(g_model.objval))
-          m.write(model, False)
-
-          best_obj = g_model.objval
-          best_sol = {var:int(var.x) for var in vars}
-
-          g_model.remove(obj_constraint)
-          obj_constraint = g_model.addConstr(g_model.getObjective() <= best_obj - 1)
-
-          FEASIBLE_COUNT = 0
-          INFEASIBLE_COUNT = 0
-        else:
-          sys.stdout.write('_')
+  TIMEOUT_COUNT = 0  # calls stopped by the time limit
+  PROVEN_COUNT = 0   # calls, that have proven nothing is better in the neighborhood
+
+
+  print("Processing " + model.name)
+  deadline = now() + timeout if timeout is not None else None
+  incumbent = Incumbent(model.set_count, on_improvement)
+
+  key = None
+  best_obj = best_sol = None
+  if solution_store is not None:
+    key = instance_key(task)
+    known = solution_store.get(key, task)
+    if known is not None:
+      print("Known solution:   {0}".format(known.cost))
+      best_obj, best_sol = known.cost, to_solution(known.chosen, model.set_count)
+      incumbent.offer(best_obj, best_sol, known.proven_as_optimal)
+
+  # Warmup: the first solution is enough
+  optimal = False
+  if best_sol is None:
+    result = m.solve(model, model.set_count*0.05, solution_limit=1)
+    if result.solution is None:
+      print("No solution in {0} s".format(model.set_count*0.05))
+      return
+    best_obj, best_sol, optimal = result.cost, result.solution, result.status == OPTIMAL
+    print("Initial solution: {0}".format(best_obj))
+    m.write(model, best_obj, best_sol, optimal)
+    if solution_store is not None:
+      m.store(solution_store, key, best_obj, best_sol, optimal)
+    incumbent.offer(best_obj, best_sol, optimal)
+
+  try:
+    while not optimal and (deadline is None or now() < deadline):
+      # Exclude the sets as described above
+      excluded = [s for s, taken in enumerate(best_sol) if not taken and random.random() < FIX_RATIO]
+      result = m.solve(model, TIMELIMIT, excluded, cutoff=best_obj - 1, start=best_sol)
+
+      if result.solution is not None and result.cost < best_obj:
+        sys.stdout.write("\nNext solution:    {0}\n".format(result.cost))
+        best_obj, best_sol = result.cost, result.solution
+        m.write(model, best_obj, best_sol)
+        if solution_store is not None:
+          m.store(solution_store, key, best_obj, best_sol)
+        incumbent.offer(best_obj, best_sol)
+
+        TIMEOUT_COUNT = 0
+        PROVEN_COUNT = 0
+      elif result.status not in (OPTIMAL, INFEASIBLE):
+        TIMEOUT_COUNT += 1;
+        sys.stdout.write('_')
       else:
-        INFEASIBLE_COUNT += 1;
+        PROVEN_COUNT += 1;
         sys.stdout.write('.')
         sys.stdout.flush()
 
-      if (FEASIBLE_COUNT+INFEASIBLE_COUNT) == SAMPLE_SIZE:
-        if FEASIBLE_COUNT > SAMPLE_SIZE * 0.2:
+      if (TIMEOUT_COUNT+PROVEN_COUNT) == SAMPLE_SIZE:
+        if TIMEOUT_COUNT > SAMPLE_SIZE * 0.2:
           TIMELIMIT = TIMELIMIT*1.1
           sys.stdout.write("(T {0})".format(TIMELIMIT))
         else:
           FIX_RATIO = FIX_RATIO - 0.01
           sys.stdout.write("(R {0})".format(FIX_RATIO))
-        FEASIBLE_COUNT = 0
-        INFEASIBLE_COUNT = 0
+        TIMEOUT_COUNT = 0
+        PROVEN_COUNT = 0
+  except KeyboardInterrupt:
+    pass
 
-  #g_model.setParam("TimeLimit", float('inf'))
-  #g_model.optimize()
-  #if g_model.status == grb.GRB.OPTIMAL:
-  #  print("Optimal solution: {0}".format(g_model.objval))
-  m.write(model)
+  m.write(model, best_obj, best_sol, optimal)
 
 if __name__ == "__main__":
-  large_neighborhood(m.create_model(m.read(sys.argv[1])))
+  instance = m.read(sys.argv[1])
+  large_neighborhood(m.create_model(instance), SolutionStore(), m.to_task(instance))
@@ -6,6 +6,9 @@ without error checking. This simple approach does not suffice for the
 larger instances. See lns.py for a large neighborhood search based on this
 model that is significantly faster.
 
+The model is solved by the first backend of
+cp_homebrew_003/mip_backend.py that can run here: Gurobi, HiGHS or CBC.
+
 Note that I usually just call the solver interactively, experiment
 around and then manually submit the solution. Thus, there is no
 automatic submit script.
@@ -13,7 +16,17 @@ automatic submit script.
 
 import sys
 import os.path
-import gurobipy as grb
+from collections import namedtuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.mip_backend import OPTIMAL, get_backends
+from cp_homebrew_003.reader import parse_instance
+
+# Tuning parameters of Gurobi derived from sc_330_0
+PARAM_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mip.prm")
+
+# backend - the backend of mip_backend.py, native - the model built by it
+Model = namedtuple("Model", ["name", "backend", "native", "set_count"])
 
 
 def read(filename):
@@ -24,84 +37,107 @@ def read(filename):
     filename: The file containing the set cover instance.
 
   Returns:
-    A triple consisting of the instance name, the number of items n
-    and the list of subsets of N := {0, ..., n - 1}. Each subset U
-    is a pair of the subset cost and the list of elements in U.
+    A pair consisting of the instance name and the reader.Instance,
+    the columns of the costs and items of all sets.
   """
   with open(filename) as file:
-    nitems, nsets = (int(x) for x in file.readline().split())
-    sets = []
-    for _ in range(nsets):
-      line = file.readline().split()
-      sets.append((float(line[0]), [int(x) for x in line[1:]]))
-    return os.path.basename(filename), nitems, sets
+    return os.path.basename(filename), parse_instance(file.read())
 
 
-def create_model(instance):
+def create_model(instance, backend=None):
   """
   Creates a simple MIP model for a set cover instance.
 
   Creates one binary decision variable s_i for each set. The objective
   function is simply the sum over the c_i * s_i. The constraints
   are that each item is captured by at least one set that is taken.
+  The model is built in bulk from the sparse incidence matrix, see
+  cp_homebrew_003/mip_backend.py.
 
   Args:
     instance: The set cover instance as created by read().
+    backend: The backend of mip_backend.py. (default: The first one
+      that can run here)
 
   Returns:
-    A pair of the Gurobi MIP model and the mapping from the sets
-    in the instance to the corresponding Gurobi variables.
+    The Model with the backend and the model built by it.
   """
-  name, nitems, sets = instance
-  model = grb.Model(name)
+  name, columns = instance
+  if backend is None:
+    backends = get_backends({"gurobi": {"threads": 3, "param_file": PARAM_FILE}})
+    if not backends:
+      raise ImportError("No MIP backend: install gurobipy, scipy >= 1.9 or cbc (e.g. with PuLP)")
+    backend = backends[0]
+  return Model(name, backend, backend.build(columns), columns.set_count)
 
-  # One variable for each set. Also remember which sets cover each item.
-  covered_by = [[] for i in range(nitems)]
-  vars = []
-  for i, set in enumerate(sets):
-    cost, covers = set
-    vars.append(model.addVar(obj=cost, vtype=grb.GRB.BINARY, name="s_{0}".format(i)))
 
-    for item in covers:
-      covered_by[item].append(vars[i])
-  model.update()
+def solve(model, time_limit=None, excluded=(), cutoff=None, solution_limit=None, start=None):
+  """
+  Solves the model, with some sets excluded for this call only.
 
-  # Constraint: Each item covered at least once.
-  for item in range(nitems):
-    model.addConstr(grb.quicksum(covered_by[item]) >= 1)
+  Args:
+    model: The set cover MIP model as created by create_model().
+    time_limit: The time limit in s. (default: No limit)
+    excluded: The indexes of the sets fixed to 0.
+    cutoff: Only solutions with a cost up to it, the status is INFEASIBLE
+      if there is none. (default: No limit)
+    solution_limit: Stop after so many solutions. (default: No limit)
+    start: The list of 0/1 for every set, the MIP start. (default: None)
 
-  # We want to minimize. Objective coefficients already fixed during variable creation.
-  model.setAttr("ModelSense", grb.GRB.MINIMIZE)
+  Returns:
+    The mip_backend.MipResult.
+  """
+  return model.backend.solve(model.native, time_limit, excluded, cutoff, solution_limit, start)
 
-  # Tuning parameters derived from sc_330_0
-  model.read("mip.prm")
 
-  model.setParam("Threads", 3)
-  model.setParam("MIPGap", 0.001)  # 0.1% usually suffices
+def write(model, cost, solution, optimal=False):
+  """
+  Writes the solution of a set cover instance to a file.
 
-  return model, vars
+  Args:
+    model: The set cover MIP model as created by create_model().
+    cost: The cost of the solution.
+    solution: The list of 0/1 for every set.
+    optimal: Is the solution proven to be optimal? (default: No)
+  """
+  with open(model.name + ".sol", "w") as file:
+    file.write("{0} {1}\n".format(cost, int(optimal)))
+    for taken in solution:
+      file.write("{0} ".format(taken))
+    file.write("\n")
 
 
-def write(model, original=True):
+def to_task(instance):
   """
-  Writes the solution of a set cover instance to a file.
+  Converts a set cover instance to the Task of cp_homebrew_003, e.g. to
+  look it up in the store of the best known solutions.
 
-  The optimality flag will only be set if this model is still the
-  original model and it states that its current solution is optimal.
+  Args:
+    instance: The set cover instance as created by read().
+
+  Returns:
+    The reader.Task with the same sets.
+  """
+  return instance[1].to_task()
+
+
+def store(solution_store, key, cost, solution, optimal=False):
+  """
+  Writes the solution of a set cover instance to the store of the best
+  known solutions. The store keeps it only if it is better than the known one.
 
   Args:
-    model: The set cover MIP model as created by create_model().
-    original: Is this still the original model? (default: Yes)
+    solution_store: The solution_store.SolutionStore.
+    key: The key of the instance, solution_store.instance_key().
+    cost: The cost of the solution.
+    solution: The list of 0/1 for every set.
+    optimal: Is the solution proven to be optimal? (default: No)
   """
-  g_model, vars = model
-  with open(g_model.getAttr("ModelName") + ".sol", "w") as file:
-    file.write("{0} {1}\n".format(g_model.objval, int(original and g_model.status == grb.GRB.status.OPTIMAL)))
-    for var in vars:
-      file.write("{0} ".format(int(var.x)))
-    file.write("\n")
+  solution_store.update(key, cost, solution, optimal, 'lns')
+
 
 if __name__ == "__main__":
-  instance = read(sys.argv[1])
-  model = create_model(instance)
-  model[0].optimize()
-  write(model)
+  model = create_model(read(sys.argv[1]))
+  result = solve(model)
+  if result.solution is not None:
+    write(model, result.cost, result.solution, result.status == OPTIMAL)
@@ -79,54 +79,51 @@
 #
 # -------------------------------------------------------------------------------
 
+import sys
 import os
-from subprocess import Popen, PIPE
-from collections import namedtuple
 
-Set = namedtuple("Set", ['index', 'cost', 'items'])
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.reader import Task, parse_input  # Set(index, cost, items) is there too
+from cp_homebrew_003.redundancy import prune_solution
+from cp_homebrew_003.exporter import export, write_minizinc_data
+from cp_homebrew_003.backend import run_backend
+
+TIMEOUT = None  # seconds for MiniZinc, None - no limit
+MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'setCovering.mzn')
 
 def solve_it(input_data):
     # parse the input
-    lines = input_data.split('\n')
+    item_count, set_count, sets = parse_input(input_data)
 
-    parts = lines[0].split()
-    item_count = int(parts[0])
-    set_count = int(parts[1])
-    
-    sets = []
-    for i in range(1, set_count+1):
-        parts = lines[i].split()
-        sets.append(Set(i-1, float(parts[0]), map(int, parts[1:])))
-
-    # generate MiniZinc data file
+    # MiniZinc data file is written into the temp directory of the run, so parallel runs don't clash
     data_file = "data.dzn"
-    generateMinizincDataFile(item_count, set_count, sets, data_file)
+    writer = lambda out: write_minizinc_data(item_count, set_count, sets, out)
 
     # specify here how many solutions the solver should maximally search for ('0' means all)
     nb_solutions = 10
 
     # solve with Minizinc's MIP solver (CBC of COIN-OR)
-    process = Popen(['mzn-g12mip', '-n', str(nb_solutions),'setCovering.mzn', 'data.dzn'],
-                    stdout=PIPE, stderr=PIPE)
+    result = run_backend(['mzn-g12mip', '-n', str(nb_solutions), MODEL, data_file],
+                         writer=writer, data_file=data_file, timeout=TIMEOUT)
     # ALTERNATIVE_1: solve with Minizinc's CP solver
-    # process = Popen(['mzn-g12fd', '-n', str(nb_solutions),'setCovering.mzn', 'data.dzn'],
-    #                stdout=PIPE, stderr=PIPE)
+    # result = run_backend(['mzn-g12fd', '-n', str(nb_solutions), MODEL, data_file],
+    #                      writer=writer, data_file=data_file, timeout=TIMEOUT)
     # ALTERNATIVE_2: solve with Minizinc's CP solver that uses learning via lazy clause generation
-    # process = Popen(['mzn-g12lazy', '-n', str(nb_solutions),'setCovering.mzn', 'data.dzn'],
-    #                stdout=PIPE, stderr=PIPE)
+    # result = run_backend(['mzn-g12lazy', '-n', str(nb_solutions), MODEL, data_file],
+    #                      writer=writer, data_file=data_file, timeout=TIMEOUT)
     # ALTERNATIVE_3: solve with CP solver Gecode (however, Gecode must be installed to do that!)
-    # process = Popen(['mzn-gecode', '-n', str(nb_solutions),'setCovering.mzn', 'data.dzn'],
-    #                stdout=PIPE, stderr=PIPE)
+    # result = run_backend(['mzn-gecode', '-n', str(nb_solutions), MODEL, data_file],
+    #                      writer=writer, data_file=data_file, timeout=TIMEOUT)
 
-    (stdout, stderr) = process.communicate()
+    (stdout, stderr) = result.stdout, result.stderr
 
     # print error messages if there are any 
     print stderr
     # extract the solution from standard-out
     solution = extractSolution(stdout,set_count)
 
-    # calculate the cost of the solution
-    obj = sum([s.cost*solution[s.index] for s in sets])
+    # drop sets, that are covered by others, and calculate the cost of the solution
+    obj, solution = prune_solution(Task(item_count, set_count, sets), solution)
 
     # prepare the solution in the specified output format
     output_data = str(obj) + ' ' + str(1) + '\n'
@@ -137,40 +134,7 @@ def solve_it(input_data):
 
 # ##################################################################################
 def generateMinizincDataFile(item_count, set_count, sets, data_file):
-    tmpFile = open(data_file, 'w')
-    
-    out = "% automatically generated Minizinc data file\n"
-    out += "nbItems = " + str(item_count)+ ";\n"
-    out += "nbSets = " + str(set_count)+ ";\n"
-    out += "weights = [ " 
-    cnt = 0
-    for s in sets: 
-        out += str(int(s.cost))
-        if cnt == len(sets)-1:
-            out += "];\n"
-        else: 
-            out += ", "
-        cnt += 1
-    out += "sets = [ "
-    cnt = 0
-    for s in sets:
-        out += " { "
-        cnt2 = 0
-        for e in s.items:
-            out += str(int(e))
-            if cnt2 == len(s.items)-1:
-                out+=" }"
-            else:
-                out+= ", "
-            cnt2 += 1
-
-        if cnt == len(sets)-1:
-            out += " ];\n"
-        else:
-            out += ", "
-        cnt += 1
-    tmpFile.write(out)
-    tmpFile.close()
+    export(write_minizinc_data, item_count, set_count, sets, data_file)
 # ##################################################################################
 def extractSolution(stdout,set_count):
     solution = []
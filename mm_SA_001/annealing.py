@@ -0,0 +1,263 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Simulated annealing for set cover in Python, the same search as setCoversa.cpp:
+moves are toggles of one set (60%) and swaps of a chosen set for a not chosen one (40%),
+and not covered items cost a penalty (4 * max cost of a set), so the search can pass through infeasible covers.
+
+Moves are evaluated without scanning the matrix. For every item we keep the count of chosen sets with it
+and the XOR of their indexes (it is the index of the only one, when the count is 1). For every set:
+ unique[s] - items, that only s covers (chosen s), so removing s costs penalty * unique[s] - cost[s]
+ gain[s] - items of s, that nobody covers, so adding s costs cost[s] - penalty * gain[s]
+A toggle is evaluated in O(1), a swap in O(size of the added set).
+Only accepted moves update the counts, in O(sum of counts of sets of its changed items).
+
+The temperature goes from start to end by the schedule over the wall-clock budget.
+"""
+
+import math
+import os
+import sys
+from collections import namedtuple
+from random import Random
+from time import time as now
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.anytime import Incumbent
+from cp_homebrew_003.reader import Instance
+from cp_homebrew_003.redundancy import remove_redundant
+from cp_homebrew_003.sparse_greedy import make_greedy
+
+TOGGLE_RATE = 0.6
+PENALTY_FACTOR = 4   # penalty of a not covered item = PENALTY_FACTOR * the max cost of a set
+END_TEMPERATURE = 0.1
+CLOCK_PERIOD = 1000  # how often (in moves) we look at the clock
+
+# chosen - indexes of chosen sets in the best cover, moves - evaluated moves, accepted - the applied ones
+AnnealResult = namedtuple('AnnealResult', ['cost', 'chosen', 'moves', 'accepted', 'elapsed'])
+
+
+def check_temperature(*temperatures):
+    # exp(-delta / temperature) of the acceptance test needs a positive temperature
+    for temperature in temperatures:
+        if not temperature > 0:
+            raise ValueError('the temperature must be > 0, got {}'.format(temperature))
+
+
+def geometric(start, end):
+    # The schedule of setCoversa.cpp: the temperature falls by the same ratio in the same time
+    check_temperature(start, end)
+    return lambda progress: start * (end / start) ** progress
+
+
+def linear(start, end):
+    check_temperature(start, end)
+    return lambda progress: start + (end - start) * progress
+
+
+def constant(temperature):
+    check_temperature(temperature)
+    return lambda progress: temperature
+
+
+def exponential_restarts(start, end, restarts):
+    # Geometric cooling, repeated restarts times: the search can leave the valley, where it has frozen
+    cool = geometric(start, end)
+    return lambda progress: cool(progress * restarts % 1.0)
+
+
+class Annealer(object):
+    def __init__(self, task, penalty=None, seed=None):
+        # Sets of the task must have indexes 0..set_count-1
+        self.task = task
+        self.set_count = task.set_count
+        self.costs = [s.cost for s in task.sets]
+        self.set_items = [sorted(set(s.items)) for s in task.sets]
+        self.item_sets = [[] for _ in xrange(task.item_count)]
+        for set_idx, items in enumerate(self.set_items):
+            for item in items:
+                self.item_sets[item].append(set_idx)
+        self.penalty = penalty if penalty is not None else PENALTY_FACTOR * max(self.costs)
+        self.random = Random(seed)
+        self.reset(())
+
+    def reset(self, chosen):
+        self.counts = [0] * self.task.item_count
+        self.owners = [0] * self.task.item_count  # XOR of indexes of chosen sets with the item
+        self.unique = [0] * self.set_count
+        self.gain = [len(items) for items in self.set_items]
+        self.is_chosen = [False] * self.set_count
+        self.chosen = []         # chosen sets, for a random pick in O(1)
+        self.positions = {}      # set_idx -> position in self.chosen
+        self.cost = 0
+        self.not_covered = self.task.item_count
+        for set_idx in chosen:
+            self.add(set_idx)
+
+    @property
+    def score(self):
+        return self.cost + self.penalty * self.not_covered
+
+    def random_start(self):
+        # Like randStart2() of setCoversa.cpp: every not covered item takes its set with the least noised cost
+        random = self.random
+        noise = max(self.costs) / 10.0
+        self.reset(())
+        for item, sets in enumerate(self.item_sets):
+            if sets and not self.counts[item]:
+                self.add(min(sets, key=lambda s: self.costs[s] + random.random() * noise))
+
+    def add_delta(self, set_idx):
+        return self.costs[set_idx] - self.penalty * self.gain[set_idx]
+
+    def remove_delta(self, set_idx):
+        return self.penalty * self.unique[set_idx] - self.costs[set_idx]
+
+    def swap_delta(self, out_idx, in_idx):
+        # out_idx is chosen, in_idx is not. Items of in_idx, that only out_idx covers, stay covered
+        counts = self.counts
+        owners = self.owners
+        kept = 0
+        for item in self.set_items[in_idx]:
+            if counts[item] == 1 and owners[item] == out_idx:
+                kept += 1
+        return (self.costs[in_idx] - self.costs[out_idx] +
+                self.penalty * (self.unique[out_idx] - kept - self.gain[in_idx]))
+
+    def add(self, set_idx):
+        counts = self.counts
+        owners = self.owners
+        unique = self.unique
+        gain = self.gain
+        for item in self.set_items[set_idx]:
+            count = counts[item]
+            if count == 0:
+                self.not_covered -= 1
+                for other_idx in self.item_sets[item]:
+                    gain[other_idx] -= 1
+                unique[set_idx] += 1
+            elif count == 1:
+                unique[owners[item]] -= 1
+            counts[item] = count + 1
+            owners[item] ^= set_idx
+        self.cost += self.costs[set_idx]
+        self.is_chosen[set_idx] = True
+        self.positions[set_idx] = len(self.chosen)
+        self.chosen.append(set_idx)
+
+    def remove(self, set_idx):
+        counts = self.counts
+        owners = self.owners
+        unique = self.unique
+        gain = self.gain
+        for item in self.set_items[set_idx]:
+            count = counts[item] - 1
+            counts[item] = count
+            owners[item] ^= set_idx
+            if count == 0:
+                self.not_covered += 1
+                for other_idx in self.item_sets[item]:
+                    gain[other_idx] += 1
+                unique[set_idx] -= 1
+            elif count == 1:
+                unique[owners[item]] += 1
+        self.cost -= self.costs[set_idx]
+        self.is_chosen[set_idx] = False
+        # the last chosen set takes the place of the removed one
+        position = self.positions.pop(set_idx)
+        last_idx = self.chosen.pop()
+        if last_idx != set_idx:
+            self.chosen[position] = last_idx
+            self.positions[last_idx] = position
+
+    def run(self, timeout, schedule=None, initial=None, max_moves=None, resume=False, on_improve=None):
+        # Anneals for timeout seconds (or max_moves moves). initial - indexes of chosen sets to start from,
+        # resume - go on from the current state of the previous run.
+        # on_improve(cost, chosen) is called on every better cover of this run.
+        # Returns AnnealResult with the best cover found, without redundant sets
+        if not resume:
+            if initial is None:
+                self.random_start()
+            else:
+                self.reset(initial)
+        if schedule is None:
+            schedule = geometric(float(self.penalty), END_TEMPERATURE)
+        random = self.random.random
+        randrange = self.random.randrange
+        exp = math.exp
+        is_chosen = self.is_chosen
+        chosen = self.chosen
+
+        started = now()
+        deadline = started + timeout
+        best_cost, best_chosen = None, None
+        if not self.not_covered:
+            best_cost, best_chosen = self.cost, list(chosen)
+        temperature = schedule(0.0)
+        check_temperature(temperature)
+        moves = accepted = 0
+        while True:
+            if moves % CLOCK_PERIOD == 0:
+                current_time = now()
+                if current_time >= deadline or max_moves is not None and moves >= max_moves:
+                    break
+                temperature = schedule(min(1.0, (current_time - started) / timeout))
+                check_temperature(temperature)
+            moves += 1
+
+            set_idx = randrange(self.set_count)
+            if random() < TOGGLE_RATE or not chosen or is_chosen[set_idx]:
+                out_idx = None
+                delta = self.remove_delta(set_idx) if is_chosen[set_idx] else self.add_delta(set_idx)
+            else:  # swap a random chosen set for the not chosen set_idx
+                out_idx = chosen[randrange(len(chosen))]
+                delta = self.swap_delta(out_idx, set_idx)
+
+            if delta > 0 and random() >= exp(-delta / temperature):
+                continue
+            accepted += 1
+            if out_idx is not None:
+                self.remove(out_idx)
+                self.add(set_idx)
+            elif is_chosen[set_idx]:
+                self.remove(set_idx)
+            else:
+                self.add(set_idx)
+            if not self.not_covered and (best_cost is None or self.cost < best_cost):
+                best_cost, best_chosen = self.cost, list(chosen)
+                if on_improve is not None:
+                    on_improve(best_cost, best_chosen)
+
+        if best_chosen is not None:
+            pruned = remove_redundant(self.task, best_chosen)
+            pruned_cost = sum(self.costs[set_idx] for set_idx in pruned)
+            if pruned_cost < best_cost and on_improve is not None:
+                on_improve(pruned_cost, pruned)  # the last streamed cover is the returned one
+            best_cost, best_chosen = pruned_cost, pruned
+        return AnnealResult(best_cost, best_chosen, moves, accepted, now() - started)
+
+
+def greedy_cover(task):
+    # The sparse greedy cover without redundant sets, when annealing has found no feasible one
+    chosen = make_greedy(Instance.from_task(task)).run()
+    covered = set()
+    for set_idx in chosen:
+        covered.update(task.sets[set_idx].items)
+    if len(covered) < task.item_count:
+        raise ValueError('{} items are in no set, there is no cover'.format(task.item_count - len(covered)))
+    return remove_redundant(task, chosen)
+
+
+def anneal(task, timeout, on_improvement=None, seed=None, schedule=None):
+    # The anytime interface: on_improvement(anytime.Improvement) gets every better cover
+    incumbent = Incumbent(task.set_count, on_improvement)
+    return Annealer(task, seed=seed).run(timeout, schedule, on_improve=incumbent.offer_chosen)
+
+
+if __name__ == '__main__':
+    from cp_homebrew_003.reader import read_input
+    for fn in ['sc_1000_11', 'sc_10000_5', 'sc_10000_2']:
+        result = Annealer(read_input(fn), seed=0).run(60)
+        print '{:<12} cost={} moves={} ({:.0f}/min) accepted={}'.format(
+            fn, result.cost, result.moves, result.moves / result.elapsed * 60, result.accepted)
@@ -16,8 +16,9 @@
 #include <stdlib.h>
 #include <stdio.h>
 #include <math.h>
+#include <string.h>
 
-char fname[11]="tmp.data\0";
+const char* fname="tmp.data"; //default input, "setCoversa <file>" reads the file, "setCoversa -" reads stdin
 //char fname[14]="sc_25_0\0";
 //char fout[18]="out.txt\0";
 const int MAXM=1024; //maximum rows
@@ -297,7 +298,7 @@ void SimAnn(HGraph* hg)
 
 }
 
-int main()
+int main(int argc, char* argv[])
 {
 	HGraph* hg;
 	FILE *fp;
@@ -311,7 +312,11 @@ int main()
 	//seed = 1106337142;
 	srand( seed );
 	maxcost=0;
-	if ((fp = fopen(fname, "r"))==NULL) 
+	if (argc > 1)
+		fname = argv[1];
+	if (strcmp(fname, "-") == 0)
+		fp = stdin;
+	else if ((fp = fopen(fname, "r"))==NULL) 
 	{
 		printf("Can't open input\n");
 		exit(1);
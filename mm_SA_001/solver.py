@@ -5,37 +5,54 @@
 #    HOW TO USE THIS SOLVER:
 # -------------------------------------------------------------------------------
 # 
+# Run this solver.py script, it anneals in Python (annealing.py) for TIMEOUT seconds
+#   python solver.py ./data/sc_25_0 [seconds]
+# If no feasible cover is found in time, it prints the greedy one
+# 
+# The original C++ version is still there, solve_it_cpp() or --cpp runs it.
 # Compile the C++ code setCoversa.cpp into an executable setCoversa
 #   Linux: g++ setCoversa.cpp -O3 -o setCoversa
-# Run this accompanying solver.py script 
-#   python solver.py ./data/sc_25_0
-# 
-# If you want the solver to think longer, you can increase MAXREPS in SimAnn() 
+#   python solver.py ./data/sc_25_0 --cpp
+# If you want it to think longer, you can increase MAXREPS in SimAnn() 
 
 import os
-from subprocess import Popen, PIPE
+import sys
 
-def solve_it(input_data):
+from annealing import Annealer, greedy_cover  # before the root is in the path: it has solver.py too
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.backend import find_executable, run_backend
+from cp_homebrew_003.reader import parse_input
 
-    # Writes the inputData to a temporay file
+TIMEOUT = 60        # seconds of annealing
+CPP_TIMEOUT = None  # seconds for setCoversa, None - no limit
 
-    tmp_file_name = 'tmp.data'
-    tmp_file = open(tmp_file_name, 'w')
-    tmp_file.write(input_data)
-    tmp_file.close()
+def solve_it(input_data, timeout=TIMEOUT):
+    task = parse_input(input_data)
+    result = Annealer(task).run(timeout)
+    cost, chosen = result.cost, result.chosen
+    if chosen is None:  # no feasible cover in time, the greedy one instead
+        chosen = greedy_cover(task)
+        cost = sum(task.sets[set_idx].cost for set_idx in chosen)
 
-    # Runs the command: java Solver -file=tmp.data
+    solution = [0]*task.set_count
+    for set_idx in chosen:
+        solution[set_idx] = 1
 
-    process = Popen(['setCoversa'], stdout=PIPE)
-    (stdout, stderr) = process.communicate()
+    # prepare the solution in the specified output format
+    output_data = str(cost) + ' ' + str(0) + '\n'
+    output_data += ' '.join(map(str, solution))
 
-    # removes the temporay file
-    os.remove(tmp_file_name)
+    return output_data
 
-    return stdout.strip()
 
+def solve_it_cpp(input_data):
 
-import sys
+    # Streams the inputData into stdin of setCoversa, it runs in a temp directory
+
+    executable = find_executable(os.path.dirname(os.path.abspath(__file__)), 'setCoversa')
+    result = run_backend([executable, '-'], writer=lambda out: out.write(input_data), timeout=CPP_TIMEOUT)
+
+    return result.stdout.strip()
 
 if __name__ == '__main__':
     if len(sys.argv) > 1:
@@ -44,7 +61,11 @@ if __name__ == '__main__':
         input_data = ''.join(input_data_file.readlines())
         input_data_file.close()
         print 'Solving:', file_location
-        print solve_it(input_data)
+        if len(sys.argv) > 2 and sys.argv[2] == '--cpp':
+            print solve_it_cpp(input_data)
+        else:
+            timeout = float(sys.argv[2]) if len(sys.argv) > 2 else TIMEOUT
+            print solve_it(input_data, timeout)
     else:
         print 'This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/sc_6_1)'
 
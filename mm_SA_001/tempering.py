@@ -0,0 +1,199 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Parallel tempering (replica exchange) on annealing.py: N replicas anneal at fixed temperatures of a geometric
+ladder, every one in its own process, attached to the instance in shared memory.
+After every round (period seconds) the master tries to exchange neighbouring replicas, with the probability
+min(1, exp((1/T1 - 1/T2) * (score1 - score2))). Replicas keep their states and swap their temperatures,
+so nothing but two numbers is sent. A cold replica, that has frozen in a valley, gets the state of a hotter one.
+Every better cover is sent to the master as soon as a replica finds it, and is streamed to on_improvement.
+
+    python tempering.py ./data/sc_10000_5 [seconds] [replicas]
+"""
+
+import os
+import sys
+from collections import namedtuple
+from math import exp
+from multiprocessing import Pipe, Process, Queue, Value, cpu_count
+from random import Random
+from time import time as now
+
+from annealing import Annealer, constant, greedy_cover  # before the root is in the path: it has solver.py too
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.anytime import Incumbent
+from cp_homebrew_003.reader import Instance, parse_input, read_input, release_instance, share_instance
+from cp_homebrew_003.redundancy import remove_redundant
+
+PERIOD = 0.5     # seconds between exchanges
+COLD = 0.1       # the ladder of temperatures goes from COLD to HOT times the average cost of a covered item
+HOT = 1.0
+TIMEOUT = 60
+
+# history - [(seconds, cost)] of improvements, exchanges - accepted ones and tries
+TemperingResult = namedtuple('TemperingResult', ['cost', 'chosen', 'history', 'rounds', 'exchanges', 'tries'])
+
+
+def get_ladder(task, replicas, cold=COLD, hot=HOT):
+    # Geometric ladder of temperatures, scaled by the cost of a covered item in an average set
+    pairs = sum(len(s.items) for s in task.sets)
+    scale = sum(s.cost for s in task.sets) / float(pairs)
+    if replicas == 1:
+        return [cold * scale]
+    return [cold * scale * (hot / cold) ** (k / float(replicas - 1)) for k in xrange(replicas)]
+
+
+def replica(replica_id, instance, seed, pipe, improvements, best_cost):
+    task = instance.as_task() if isinstance(instance, Instance) else instance
+    annealer = Annealer(task, seed=seed)
+    annealer.random_start()
+
+    def on_improve(cost, chosen):
+        # Only the covers, that are better than the best of all replicas, go to the master
+        if cost < best_cost.value:
+            with best_cost.get_lock():
+                if cost >= best_cost.value:
+                    return
+                best_cost.value = cost
+            improvements.put((replica_id, cost, list(chosen)))
+
+    while True:
+        command = pipe.recv()
+        if command is None:
+            break
+        temperature, seconds = command
+        annealer.run(seconds, schedule=constant(temperature), resume=True, on_improve=on_improve)
+        pipe.send(annealer.score)
+
+
+def parallel_tempering(task, timeout=TIMEOUT, on_improvement=None, replicas=None, seed=None, period=PERIOD):
+    # on_improvement(anytime.Improvement) is called on every improvement over all replicas
+    replicas = replicas or cpu_count()
+    temperatures = get_ladder(task, replicas)
+    random = Random(seed)
+    started = now()
+    deadline = started + timeout
+
+    instance = share_instance(Instance.from_task(task))
+    improvements = Queue()
+    best_cost = Value('d', float('inf'))
+    pipes, processes = [], []
+    for replica_id in xrange(replicas):
+        master_end, replica_end = Pipe()
+        process = Process(target=replica, args=(replica_id, instance, random.randint(0, sys.maxint),
+                                                replica_end, improvements, best_cost))
+        process.start()
+        pipes.append(master_end)
+        processes.append(process)
+
+    history = []
+    incumbent = Incumbent(task.set_count, on_improvement)
+    best = [float('inf'), None]  # cost, chosen
+
+    def collect():
+        # Streams out the improvements, that replicas have sent so far
+        while not improvements.empty():
+            replica_id, cost, chosen = improvements.get()
+            if incumbent.offer_chosen(cost, chosen):
+                best[:] = cost, chosen
+                history.append((now() - started, cost))
+
+    def wait_score(replica_id):
+        # The score of the replica after its round, None - the replica has died
+        pipe, process = pipes[replica_id], processes[replica_id]
+        while not pipe.poll(0.01):  # stream improvements, while replicas anneal
+            collect()
+            if not process.is_alive() and not pipe.poll():
+                return None
+        try:
+            return pipe.recv()
+        except EOFError:
+            return None
+
+    # order[k] - the replica at the temperature k
+    order = range(replicas)
+    rounds = exchanges = tries = 0
+    try:
+        while now() < deadline:
+            seconds = min(period, deadline - now())
+            for k, replica_id in enumerate(order):
+                pipes[replica_id].send((temperatures[k], seconds))
+            scores = {replica_id: wait_score(replica_id) for replica_id in order}
+            for k in reversed(xrange(len(order))):
+                if scores[order[k]] is None:  # the ladder goes on without the dead replica and its temperature
+                    del order[k], temperatures[k]
+            if not order:
+                raise RuntimeError('all replicas have died, exit codes: {}'.format(
+                    [process.exitcode for process in processes]))
+            rounds += 1
+            # Even and odd pairs of neighbours by turns
+            for k in xrange(rounds % 2, len(order) - 1, 2):
+                cold_id, hot_id = order[k], order[k + 1]
+                tries += 1
+                power = (1 / temperatures[k] - 1 / temperatures[k + 1]) * (scores[cold_id] - scores[hot_id])
+                if power >= 0 or random.random() < exp(power):
+                    order[k], order[k + 1] = hot_id, cold_id
+                    exchanges += 1
+    finally:
+        for pipe, process in zip(pipes, processes):
+            if process.is_alive():
+                pipe.send(None)
+        for process in processes:
+            while process.is_alive():  # a replica can't exit, until the master takes its improvements
+                collect()
+                process.join(0.01)
+        release_instance(instance.shared_name)
+    collect()
+
+    cost, chosen = best
+    if chosen is not None:
+        chosen = remove_redundant(task, chosen)
+        cost = sum(task.sets[set_idx].cost for set_idx in chosen)
+        if incumbent.offer_chosen(cost, chosen):  # the last streamed cover is the returned one
+            history.append((now() - started, cost))
+    return TemperingResult(cost, chosen, history, rounds, exchanges, tries)
+
+
+def solve_it(input_data, timeout=TIMEOUT, replicas=None):
+    task = parse_input(input_data)
+    result = parallel_tempering(task, timeout, replicas=replicas)
+    cost, chosen = result.cost, result.chosen
+    if chosen is None:  # no replica has found a feasible cover in time, the greedy one instead
+        chosen = greedy_cover(task)
+        cost = sum(task.sets[set_idx].cost for set_idx in chosen)
+
+    solution = [0]*task.set_count
+    for set_idx in chosen:
+        solution[set_idx] = 1
+
+    # prepare the solution in the specified output format
+    output_data = str(cost) + ' ' + str(0) + '\n'
+    output_data += ' '.join(map(str, solution))
+
+    return output_data
+
+
+def print_scaling(filenames=('sc_5000_1', 'sc_10000_5'), timeout=TIMEOUT, replicas_list=(1, 2, 4, 8), seed=0):
+    # Quality of the solution by the count of replicas for the same wall-clock time
+    for fn in filenames:
+        task = read_input(fn)
+        for replicas in replicas_list:
+            result = parallel_tempering(task, timeout, replicas=replicas, seed=seed)
+            print '{:<12} replicas={} cost={} rounds={} exchanges={}/{} first={} last={}'.format(
+                fn, replicas, result.cost, result.rounds, result.exchanges, result.tries,
+                result.history[0] if result.history else None, result.history[-1] if result.history else None)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        timeout = float(sys.argv[2]) if len(sys.argv) > 2 else TIMEOUT
+        replicas = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        input_data_file = open(file_location, 'r')
+        input_data = ''.join(input_data_file.readlines())
+        input_data_file.close()
+        print 'Solving:', file_location
+        print solve_it(input_data, timeout, replicas)
+    else:
+        print_scaling()
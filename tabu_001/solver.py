@@ -0,0 +1,72 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------------------
+#    HOW TO USE THIS SOLVER:
+# -------------------------------------------------------------------------------
+#
+# Tabu search with the 3-flip neighbourhood (tabu.py), it improves a cover until the timeout
+#   python solver.py ./data/sc_10000_5 [seconds] [start]
+# start is a file with the output of any other solver.py, e.g.
+#   python ../greedy_002/solver.py ../data/sc_10000_5 | tail -n 2 > start.txt
+#   python solver.py ../data/sc_10000_5 60 start.txt
+# Without it, the search starts from the greedy cover.
+# If no feasible cover is found in time (e.g. the start is not one), it prints the greedy one
+
+import os
+import sys
+
+from tabu import TabuSearch  # before the root is in the path: it has solver.py too
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.reader import Instance, parse_input, parse_output
+from cp_homebrew_003.redundancy import remove_redundant
+from cp_homebrew_003.sparse_greedy import make_greedy
+
+TIMEOUT = 60  # seconds
+
+def greedy_cover(task):
+    chosen = make_greedy(Instance.from_task(task)).run()
+    covered = set()
+    for set_idx in chosen:
+        covered.update(task.sets[set_idx].items)
+    if len(covered) < task.item_count:
+        raise ValueError('{} items are in no set, there is no cover'.format(task.item_count - len(covered)))
+    return remove_redundant(task, chosen)
+
+
+def solve_it(input_data, timeout=TIMEOUT, start=None):
+    # start - the output of another solve_it(), to improve it
+    task = parse_input(input_data)
+    initial = None
+    if start is not None:
+        cost, is_optimal, solution = parse_output(start)
+        initial = [set_idx for set_idx, taken in enumerate(solution) if taken]
+    result = TabuSearch(task).run(timeout, initial)
+    cost, chosen = result.cost, result.chosen
+    if chosen is None:  # no feasible cover in time, the greedy one instead
+        chosen = greedy_cover(task)
+        cost = sum(task.sets[set_idx].cost for set_idx in chosen)
+
+    solution = [0]*task.set_count
+    for set_idx in chosen:
+        solution[set_idx] = 1
+
+    # prepare the solution in the specified output format
+    output_data = str(cost) + ' ' + str(0) + '\n'
+    output_data += ' '.join(map(str, solution))
+
+    return output_data
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        timeout = float(sys.argv[2]) if len(sys.argv) > 2 else TIMEOUT
+        start = open(sys.argv[3]).read() if len(sys.argv) > 3 else None
+        input_data_file = open(file_location, 'r')
+        input_data = ''.join(input_data_file.readlines())
+        input_data_file.close()
+        print 'Solving:', file_location
+        print solve_it(input_data, timeout, start)
+    else:
+        print 'This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/sc_6_1)'
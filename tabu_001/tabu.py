@@ -0,0 +1,322 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+Tabu search with weighted items and the 3-flip neighbourhood, after Yagiura, Kishida and Ibaraki,
+"A 3-flip neighborhood local search for the set covering problem" (2006).
+
+The search minimizes cost + sum of weights of not covered items, so it walks through infeasible covers.
+ * A feasible cover drops the chosen set, whose removal costs least: weights of its unique items - its cost.
+ * An infeasible one takes a random not covered item, and tries to cover it: to add a set with the item
+   (1-flip) or to swap it for a chosen set (2-flip). Then chosen sets, that have become redundant,
+   are removed (add one and drop two is the 3-flip).
+ * When no such move is improving, weights of not covered items grow, so they get covered sooner or later.
+ * A removed set can't be added back (and an added one removed) for a few random iterations.
+
+Nothing is scanned on an iteration. We keep:
+ counts[i], owners[i] - count of chosen sets with the item i, and XOR of their indexes (the owner, if the count is 1)
+ gain[s] - weights of not covered items of s: adding s changes the score by cost[s] - gain[s]
+ loss[s] - weights of items, that only s covers: removing s changes the score by loss[s] - cost[s]
+A swap of s1 for s2 changes it by the sum of both, minus weights of items of s2, that only s1 covers.
+Candidates are only the sets of one not covered item, and chosen sets, that cover their items.
+Chosen sets are kept in a lazy heap by loss[s] - cost[s], so swaps look only at the cheapest removals.
+"""
+
+import os
+import sys
+from collections import namedtuple
+from heapq import heapify, heappop, heappush
+from itertools import izip
+from random import Random
+from time import time as now
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from cp_homebrew_003.anytime import Incumbent
+from cp_homebrew_003.reader import Instance
+from cp_homebrew_003.redundancy import remove_redundant
+from cp_homebrew_003.sparse_greedy import make_greedy
+
+TENURE = (3, 10)           # an iteration puts a flipped set into tabu for random(TENURE) iterations
+WEIGHT_STEP = 0.2          # a stuck search adds WEIGHT_STEP * the cost of its cheapest set to every not covered item
+NORMALIZE_PERIOD = 1000    # halve the weights after so many raises, so the costs matter again
+CLOCK_PERIOD = 16          # how often (in iterations) we look at the clock
+EPSILON = 1e-6             # rounding errors of sums of weights, any weight is much larger
+HEAP_SLACK = 64            # the heap of removals is rebuilt, when it has this many stale entries over 2 per chosen set
+
+# chosen - indexes of chosen sets of the best cover, history - [(seconds, cost)] of improvements
+TabuResult = namedtuple('TabuResult', ['cost', 'chosen', 'iterations', 'elapsed', 'history'])
+
+
+class IndexedSet(object):
+    # Set of ints with a random pick, addition and removal in O(1)
+    def __init__(self):
+        self.values = []
+        self.positions = {}
+
+    def add(self, value):
+        self.positions[value] = len(self.values)
+        self.values.append(value)
+
+    def remove(self, value):
+        position = self.positions.pop(value)
+        last = self.values.pop()
+        if last != value:
+            self.values[position] = last
+            self.positions[last] = position
+
+    def __contains__(self, value):
+        return value in self.positions
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def pick(self, random):
+        return self.values[random.randrange(len(self.values))]
+
+
+class TabuSearch(object):
+    def __init__(self, task, seed=None):
+        # Sets of the task must have indexes 0..set_count-1
+        self.task = task
+        self.costs = [s.cost for s in task.sets]
+        self.set_items = [sorted(set(s.items)) for s in task.sets]
+        self.item_sets = [[] for _ in xrange(task.item_count)]
+        for set_idx, items in enumerate(self.set_items):
+            for item in items:
+                self.item_sets[item].append(set_idx)
+        self.cheapest = [min(self.costs[s] for s in sets) if sets else 0.0 for sets in self.item_sets]
+        self.random = Random(seed)
+
+    def reset(self, chosen):
+        task = self.task
+        self.weights = [float(cost) for cost in self.cheapest]
+        self.counts = [0] * task.item_count
+        self.owners = [0] * task.item_count
+        self.gain = [sum(self.weights[item] for item in items) for items in self.set_items]
+        self.loss = [0.0] * task.set_count
+        self.chosen = IndexedSet()
+        # removals - heap of (loss[s] - cost[s], s, version) of chosen sets, an entry is stale if versions[s] has changed
+        self.removals = []
+        self.versions = [0] * task.set_count
+        self.not_covered = IndexedSet()
+        for item in xrange(task.item_count):
+            self.not_covered.add(item)
+        self.cost = 0
+        self.raises = 0
+        for set_idx in chosen:
+            self.add(set_idx)
+
+    def add(self, set_idx):
+        counts, owners, weights, gain, loss = self.counts, self.owners, self.weights, self.gain, self.loss
+        changed = {set_idx}
+        for item in self.set_items[set_idx]:
+            count = counts[item]
+            if count == 0:
+                self.not_covered.remove(item)
+                weight = weights[item]
+                for other_idx in self.item_sets[item]:
+                    gain[other_idx] -= weight
+                loss[set_idx] += weight
+            elif count == 1:
+                owner = owners[item]
+                loss[owner] -= weights[item]
+                changed.add(owner)
+            counts[item] = count + 1
+            owners[item] ^= set_idx
+        self.cost += self.costs[set_idx]
+        self.chosen.add(set_idx)
+        self.push_removals(changed)
+
+    def remove(self, set_idx):
+        counts, owners, weights, gain, loss = self.counts, self.owners, self.weights, self.gain, self.loss
+        changed = set()
+        for item in self.set_items[set_idx]:
+            count = counts[item] - 1
+            counts[item] = count
+            owners[item] ^= set_idx
+            if count == 0:
+                self.not_covered.add(item)
+                weight = weights[item]
+                for other_idx in self.item_sets[item]:
+                    gain[other_idx] += weight
+                loss[set_idx] -= weight
+            elif count == 1:
+                owner = owners[item]
+                loss[owner] += weights[item]
+                changed.add(owner)
+        self.cost -= self.costs[set_idx]
+        self.chosen.remove(set_idx)
+        self.versions[set_idx] += 1  # its entries are stale now
+        self.push_removals(changed)
+
+    def push_removals(self, changed):
+        # New entries of chosen sets, whose loss has changed
+        loss, costs, versions, removals = self.loss, self.costs, self.versions, self.removals
+        for set_idx in changed:
+            version = versions[set_idx] + 1
+            versions[set_idx] = version
+            heappush(removals, (loss[set_idx] - costs[set_idx], set_idx, version))
+        if len(removals) > 2 * len(self.chosen) + HEAP_SLACK:
+            self.rebuild_removals()
+
+    def rebuild_removals(self):
+        loss, costs, versions = self.loss, self.costs, self.versions
+        self.removals = removals = [(loss[s] - costs[s], s, versions[s]) for s in self.chosen]
+        heapify(removals)
+
+    def raise_weights(self):
+        # Only not covered items: they are in gain of their sets, and in loss of nobody
+        weights, gain = self.weights, self.gain
+        for item in self.not_covered:
+            step = WEIGHT_STEP * self.cheapest[item]
+            weights[item] += step
+            for set_idx in self.item_sets[item]:
+                gain[set_idx] += step
+        self.raises += 1
+        if self.raises % NORMALIZE_PERIOD == 0:
+            self.normalize()
+
+    def normalize(self):
+        # Halves the weights (not below the cheapest cost) and recounts gain and loss from scratch
+        self.weights = weights = [max(cheapest, weight / 2) for cheapest, weight in izip(self.cheapest, self.weights)]
+        counts, owners = self.counts, self.owners
+        self.gain = [sum(weights[item] for item in items if not counts[item]) for items in self.set_items]
+        self.loss = loss = [0.0] * self.task.set_count
+        for item, count in enumerate(counts):
+            if count == 1:
+                loss[owners[item]] += weights[item]
+        self.rebuild_removals()
+
+    def remove_redundant(self, added, iteration, tabu):
+        # Chosen sets, whose items are covered by others too, the most expensive first.
+        # Only the sets, that share an item with the added one, can have lost their loss
+        counts, owners, loss = self.counts, self.owners, self.loss
+        redundant = {owners[item] ^ added for item in self.set_items[added] if counts[item] == 2}
+        redundant = [s for s in redundant if loss[s] < EPSILON]
+        while redundant:
+            set_idx = max(redundant, key=self.costs.__getitem__)
+            redundant.remove(set_idx)
+            if loss[set_idx] < EPSILON:
+                self.remove(set_idx)
+                tabu[set_idx] = iteration + self.random.randint(*TENURE)
+
+    def best_cover_move(self, iteration, tabu):
+        # (delta, removed set or None, added set) for a random not covered item
+        costs, gain, loss, counts, owners, weights = \
+            self.costs, self.gain, self.loss, self.counts, self.owners, self.weights
+        item = self.not_covered.pick(self.random)
+        candidates = []
+        for in_idx in self.item_sets[item]:
+            if tabu[in_idx] > iteration:
+                continue
+            # weights of items of in_idx, that only their owners cover: they stay covered after the swap
+            kept = {}
+            for other_item in self.set_items[in_idx]:
+                if counts[other_item] == 1:
+                    owner = owners[other_item]
+                    kept[owner] = kept.get(owner, 0.0) + weights[other_item]
+            candidates.append((in_idx, kept))
+        if not candidates:
+            return None
+        # removals are popped from the heap in order, only as far as some candidate needs them,
+        # and pushed back at the end. Stale entries are dropped, tabu ones are put aside
+        removals, versions = self.removals, self.versions
+        ordered, aside = [], []
+        best = None
+        for in_idx, kept in candidates:
+            add_delta = costs[in_idx] - gain[in_idx]
+            if best is None or add_delta < best[0]:
+                best = (add_delta, None, in_idx)
+            for out_idx, weight in kept.iteritems():
+                if tabu[out_idx] <= iteration:
+                    delta = add_delta + loss[out_idx] - costs[out_idx] - weight
+                    if delta < best[0]:
+                        best = (delta, out_idx, in_idx)
+            position = 0  # the best swap with a set, that keeps nothing
+            while position < len(ordered) or removals:
+                if position == len(ordered):
+                    entry = heappop(removals)
+                    if entry[2] != versions[entry[1]]:
+                        continue
+                    (aside if tabu[entry[1]] > iteration else ordered).append(entry)
+                    continue
+                remove_delta, out_idx, _ = ordered[position]
+                if out_idx not in kept:
+                    if add_delta + remove_delta < best[0]:
+                        best = (add_delta + remove_delta, out_idx, in_idx)
+                    break
+                position += 1
+        for entry in ordered + aside:
+            heappush(removals, entry)
+        return best
+
+    def run(self, timeout, initial=None, on_improve=None):
+        # Improves the initial cover (indexes of chosen sets, the greedy one by default) until the deadline.
+        # on_improve(cost, chosen) is called on every better cover.
+        # Returns TabuResult with the best cover found, without redundant sets
+        if initial is None:
+            initial = make_greedy(Instance.from_task(self.task)).run()
+        self.reset(initial)
+        started = now()
+        deadline = started + timeout
+        tabu = [0] * self.task.set_count  # tabu[s] - the first iteration, when s can be flipped again
+        best_cost, best_chosen = None, None
+        history = []
+        iteration = 0
+        while True:
+            iteration += 1
+            if iteration % CLOCK_PERIOD == 0 and now() >= deadline:
+                break
+            if not self.not_covered:
+                if best_cost is None or self.cost < best_cost:
+                    best_cost, best_chosen = self.cost, list(self.chosen)
+                    history.append((now() - started, best_cost))
+                    if on_improve is not None:
+                        on_improve(best_cost, best_chosen)
+                # drop the set, that costs least to lose
+                removable = [s for s in self.chosen if tabu[s] <= iteration] or list(self.chosen)
+                out_idx = min(removable, key=lambda s: self.loss[s] - self.costs[s])
+                self.remove(out_idx)
+                tabu[out_idx] = iteration + self.random.randint(*TENURE)
+                continue
+
+            move = self.best_cover_move(iteration, tabu)
+            if move is None:  # all sets of the item are tabu
+                self.raise_weights()
+                continue
+            delta, out_idx, in_idx = move
+            if delta >= 0:
+                self.raise_weights()  # a local optimum for these weights
+            if out_idx is not None:
+                self.remove(out_idx)
+                tabu[out_idx] = iteration + self.random.randint(*TENURE)
+            self.add(in_idx)
+            tabu[in_idx] = iteration + self.random.randint(*TENURE)
+            self.remove_redundant(in_idx, iteration, tabu)
+
+        if best_chosen is not None:
+            pruned = remove_redundant(self.task, best_chosen)
+            pruned_cost = sum(self.costs[set_idx] for set_idx in pruned)
+            if pruned_cost < best_cost:
+                history.append((now() - started, pruned_cost))
+                if on_improve is not None:
+                    on_improve(pruned_cost, pruned)  # the last streamed cover is the returned one
+            best_cost, best_chosen = pruned_cost, pruned
+        return TabuResult(best_cost, best_chosen, iteration, now() - started, history)
+
+
+def tabu_search(task, timeout, on_improvement=None, seed=None):
+    # The anytime interface: on_improvement(anytime.Improvement) gets every better cover
+    incumbent = Incumbent(task.set_count, on_improvement)
+    return TabuSearch(task, seed).run(timeout, on_improve=incumbent.offer_chosen)
+
+
+if __name__ == '__main__':
+    from cp_homebrew_003.reader import read_input
+    for fn in ['sc_1000_11', 'sc_5000_1', 'sc_10000_5', 'sc_10000_2']:
+        result = TabuSearch(read_input(fn), seed=0).run(60)
+        print '{:<12} cost={} iterations={} ({:.0f}/sec) improvements={}'.format(
+            fn, result.cost, result.iterations, result.iterations / result.elapsed, result.history[-3:])